@@ -0,0 +1,169 @@
+'''
+Animated export of solution frames.
+
+The frames of a solution go into one animated GIF or APNG file instead of
+one PNG file each. Every frame is encoded and written as soon as it is
+added, so only the frame being written is ever held in memory, however
+long the solution is.
+
+    GIF_Writer:  palette frames, through the GIF helpers of Pillow.
+    APNG_Writer: RGB frames, written chunk by chunk with zlib; the frame
+                 count at the head of the file is filled in on close.
+
+open_animation picks the writer from the file extension.
+'''
+import struct
+import zlib
+
+from PIL import Image, GifImagePlugin
+
+
+DEFAULT_FRAME_DURATION = 200
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Pillow 9.1 moved the dither modes into Image.Dither, Pillow 10 dropped the old names
+NO_DITHER = getattr(Image, "Dither", Image).NONE
+
+
+class GIF_Writer():
+    '''
+    Streams frames into an animated GIF that loops forever.
+    '''
+
+    def __init__(self, path, duration=DEFAULT_FRAME_DURATION, palette=None):
+        self.file = open(path, "wb")
+        self.duration = duration
+        self.palette_image = Image.new("P", (1, 1))
+        color_list = [channel for color in palette for channel in color]
+        self.palette_image.putpalette(color_list + color_list[:3] * (256 - len(palette)))
+        self.frame_count = 0
+
+    def add_frame(self, image):
+        '''
+        This function encodes one RGB frame and writes it out.
+
+        **Parameters**
+
+            image: *Image*
+                the frame, all frames of the same size.
+
+        **Returns**
+
+            None.
+        '''
+        frame = image.quantize(palette=self.palette_image, dither=NO_DITHER)
+        if self.frame_count == 0:
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": 0, "optimize": False})
+            self.file.write(b"".join(header))
+        for data in GifImagePlugin.getdata(frame, duration=self.duration):
+            self.file.write(data)
+        self.frame_count += 1
+
+    def close(self):
+        # the GIF trailer
+        self.file.write(b";")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class APNG_Writer():
+    '''
+    Streams frames into an animated PNG that loops forever.
+    '''
+
+    def __init__(self, path, duration=DEFAULT_FRAME_DURATION, palette=None):
+        self.file = open(path, "wb")
+        self.duration = duration
+        self.frame_count = 0
+        self.sequence = 0
+        self.size = None
+        self.animation_control = None
+
+    def write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack(">I", len(data)) + chunk_type + data)
+        self.file.write(struct.pack(">I", zlib.crc32(chunk_type + data)))
+
+    def add_frame(self, image):
+        '''
+        This function encodes one RGB frame and writes it out.
+
+        **Parameters**
+
+            image: *Image*
+                the frame, all frames of the same size.
+
+        **Returns**
+
+            None.
+        '''
+        image = image.convert("RGB")
+        width, height = image.size
+        if self.frame_count == 0:
+            self.size = image.size
+            self.file.write(PNG_SIGNATURE)
+            # 8 bit RGB, no interlacing
+            self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            # frame count and loop count, the frame count is filled in by close
+            self.animation_control = self.file.tell()
+            self.write_chunk(b"acTL", struct.pack(">II", 0, 0))
+        elif image.size != self.size:
+            raise ValueError("every frame must be %dx%d" % self.size)
+
+        self.write_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, width, height, 0, 0,
+                                              self.duration, 1000, 0, 0))
+        self.sequence += 1
+        pixels = image.tobytes()
+        line = width * 3
+        # filter type 0 in front of every line
+        raw = b"".join(b"\x00" + pixels[y * line:(y + 1) * line] for y in range(height))
+        data = zlib.compress(raw)
+        if self.frame_count == 0:
+            self.write_chunk(b"IDAT", data)
+        else:
+            self.write_chunk(b"fdAT", struct.pack(">I", self.sequence) + data)
+            self.sequence += 1
+        self.frame_count += 1
+
+    def close(self):
+        if self.frame_count > 0:
+            self.write_chunk(b"IEND", b"")
+            self.file.seek(self.animation_control)
+            self.write_chunk(b"acTL", struct.pack(">II", self.frame_count, 0))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def open_animation(path, duration=DEFAULT_FRAME_DURATION, palette=None):
+    '''
+    This function opens the writer matching the file extension,
+    .gif for GIF_Writer, .png or .apng for APNG_Writer.
+
+    **Parameters**
+
+        path: *str*
+            output file.
+        duration: *int*
+            milliseconds each frame is shown.
+        palette: *list*
+            the RGB colors the frames are made of, needed by GIF.
+
+    **Returns**
+
+        writer: *GIF_Writer or APNG_Writer*
+            use it in a with block and add the frames one by one.
+    '''
+    extension = path.rsplit(".", 1)[-1].lower()
+    if extension == "gif":
+        return GIF_Writer(path, duration, palette)
+    if extension in ("png", "apng"):
+        return APNG_Writer(path, duration, palette)
+    raise ValueError("unknown animation format %r, use .gif, .png or .apng" % (extension,))
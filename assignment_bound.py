@@ -0,0 +1,227 @@
+'''
+Minimum cost box to target assignment, the lower bound of the push box
+solver's informed search.
+
+The cost of sending a box to a target is the push distance of the
+Compact_Board, other boxes ignored. Every target needs its own box, so the
+cheapest assignment never overestimates the pushes left. Spare boxes are
+sent to free dummy targets. Assignment_Bound solves it with the Hungarian
+method once, then after a single push only the row of the moved box is
+put back in, which is O(n^2) instead of the O(n^3) of a fresh solve.
+'''
+from compact_board import iterate_cells
+
+
+def build_cost_rows(board):
+    '''
+    This function lays the push distances out as one cost row per floor
+    block, in target order, so the assignment reads a whole row at once.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+
+    **Returns**
+
+        cost_rows: *dict*
+            flat index -> list of costs, one per target, then a zero for
+            every spare box. A target that can not be reached costs more
+            than any real assignment.
+    '''
+    target_list = sorted(board.push_distances)
+    unreachable_cost = board.size * (len(target_list) + 1)
+    cost_rows = {}
+    for cell in iterate_cells(board.floor):
+        row = []
+        for target in target_list:
+            distance = board.push_distances[target][cell]
+            row.append(unreachable_cost if distance is None else distance)
+        cost_rows[cell] = row + [0] * board.spare_boxes
+    return cost_rows
+
+
+class Assignment_Bound():
+    '''
+    The minimum cost assignment of the boxes to the targets, following the
+    search through update and retrospect. Rows are boxes, columns targets,
+    both counted from 1 as the Hungarian method below expects; p[j] is the
+    row assigned to column j, u and v are the row and column potentials.
+    '''
+
+    def __init__(self, board, boxes, cost_rows=None):
+        self.board = board
+        if cost_rows is None:
+            cost_rows = build_cost_rows(board)
+        self.cost_rows = cost_rows
+        self.column_count = len(board.push_distances) + board.spare_boxes
+        self.rebuild(boxes)
+
+    def rebuild(self, boxes):
+        '''
+        This function solves the assignment from scratch.
+
+        **Parameters**
+
+            boxes: *int*
+                box bit mask.
+
+        **Returns**
+
+            None.
+        '''
+        self.boxes = boxes
+        self.journal = []
+        self.row_cost = [None] + [self.cost_rows[cell] for cell in iterate_cells(boxes)]
+        # a level with more targets than boxes gets free rows for the spare targets
+        while len(self.row_cost) <= self.column_count:
+            self.row_cost.append([0] * self.column_count)
+        self.row_of_cell = {cell: row for row, cell in enumerate(iterate_cells(boxes), 1)}
+
+        self.u = [0] * len(self.row_cost)
+        self.v = [0] * (self.column_count + 1)
+        self.p = [0] * (self.column_count + 1)
+        for row in range(1, len(self.row_cost)):
+            self.add_row(row)
+        self.bound = self.total_cost()
+
+    def add_row(self, row):
+        '''
+        This function is one round of the Hungarian method: it assigns an
+        unassigned row through the shortest augmenting path, moving the
+        potentials so that every assigned pair stays tight.
+
+        **Parameters**
+
+            row: *int*
+                the unassigned row.
+
+        **Returns**
+
+            None.
+        '''
+        u, v, p = self.u, self.v, self.p
+        column_count = self.column_count
+        row_cost = self.row_cost
+        infinite = float("inf")
+
+        p[0] = row
+        j0 = 0
+        minv = [infinite] * (column_count + 1)
+        way = [0] * (column_count + 1)
+        used = [False] * (column_count + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            costs = row_cost[i0]
+            delta = infinite
+            j1 = 0
+            for j in range(1, column_count + 1):
+                if used[j] is False:
+                    reduced = costs[j - 1] - u[i0] - v[j]
+                    if reduced < minv[j]:
+                        minv[j] = reduced
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(column_count + 1):
+                if used[j] is True:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        while j0 != 0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+        p[0] = 0
+
+    def total_cost(self):
+        return sum(self.row_cost[self.p[j]][j - 1] for j in range(1, self.column_count + 1))
+
+    def update(self, cell, destination):
+        '''
+        This function follows the push of the box on cell onto destination.
+        Only the moved box's row changes. If its target is still the
+        cheapest one under the current potentials nothing else moves,
+        otherwise the row is assigned again with one Hungarian round.
+
+        **Parameters**
+
+            cell: *int*
+                flat index the box left.
+            destination: *int*
+                flat index the box was pushed onto.
+
+        **Returns**
+
+            bound: *int*
+                the new lower bound.
+        '''
+        row = self.row_of_cell.pop(cell)
+        self.journal.append((cell, destination, row, self.u[:], self.v[:], self.p[:], self.bound))
+        self.row_of_cell[destination] = row
+        self.boxes ^= (1 << cell) | (1 << destination)
+
+        costs = self.cost_rows[destination]
+        self.row_cost[row] = costs
+        v = self.v
+        column = self.p.index(row, 1)
+        reduced_list = [costs[j - 1] - v[j] for j in range(1, self.column_count + 1)]
+        if reduced_list[column - 1] == min(reduced_list):
+            self.u[row] = reduced_list[column - 1]
+        else:
+            self.p[column] = 0
+            self.add_row(row)
+        self.bound = self.total_cost()
+        return self.bound
+
+    def retrospect(self):
+        '''
+        This function undoes the last update.
+
+        **Returns**
+
+            None.
+        '''
+        cell, destination, row, self.u, self.v, self.p, self.bound = self.journal.pop()
+        del self.row_of_cell[destination]
+        self.row_of_cell[cell] = row
+        self.boxes ^= (1 << cell) | (1 << destination)
+        self.row_cost[row] = self.cost_rows[cell]
+
+    def follow(self, boxes):
+        '''
+        This function brings the assignment to a new box mask. Searches
+        move along a path, so the journal is unwound until the mask is at
+        most one push away and that push is then applied incrementally;
+        anything further away is solved from scratch.
+
+        **Parameters**
+
+            boxes: *int*
+                box bit mask.
+
+        **Returns**
+
+            bound: *int*
+                the lower bound for the mask.
+        '''
+        while bin(boxes ^ self.boxes).count("1") > 2 and len(self.journal) > 0:
+            self.retrospect()
+
+        difference = boxes ^ self.boxes
+        if difference == 0:
+            return self.bound
+        if bin(difference).count("1") == 2:
+            cell = (difference & self.boxes).bit_length() - 1
+            destination = (difference & boxes).bit_length() - 1
+            return self.update(cell, destination)
+
+        self.rebuild(boxes)
+        return self.bound
@@ -0,0 +1,229 @@
+'''
+Batch solver for many push box levels.
+
+Every level file runs in its own worker process, at most `processes` of
+them at a time. The search of a level stops itself once its time, node or
+visited set budget is spent and still reports its stats; a worker that
+does not stop within KILL_GRACE seconds of its time limit is terminated
+without touching the others. One JSON line is written per level as soon
+as it is done:
+
+    level:       path of the .data file.
+    status:      "solved", "failed", "timeout", "node_limit",
+                 "visited_limit" or "error".
+    winner:      with --strategy portfolio, the configuration that won.
+    pushes:      length of the solution, None when there is none.
+    nodes:       states expanded by the search, None when unknown.
+    stats:       every counter of search_stats.py, None when unknown.
+    time:        wall-clock seconds spent on the level.
+    peak_rss_kb: peak resident memory of the worker, None when unknown.
+
+Usage:
+
+    python batch_solver.py levels/ --processes 4 --time-limit 60 --max-nodes 1000000
+'''
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from box_common import GAME_FAILED, GAME_UNFINISHED
+from box_3 import load_unit_test, generate_solution
+from search_stats import Search_Stats
+from portfolio import solve_portfolio
+
+
+# seconds a worker is given past its time limit to report before it is terminated
+KILL_GRACE = 5.0
+
+
+def find_level_files(pattern):
+    '''
+    This function lists the level files to solve.
+
+    **Parameters**
+
+        pattern: *str*
+            a directory, all its .data files are taken, or a glob pattern.
+
+    **Returns**
+
+        level_list: *list*
+            sorted paths of the level files.
+    '''
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.data")
+    return sorted(glob.glob(pattern))
+
+
+def solve_level(level, strategy, heuristic, max_nodes, max_visited, time_limit, connection):
+    '''
+    This function is the worker: it solves one level and sends its record
+    back through the connection.
+
+    **Parameters**
+
+        level: *str*
+            path of the level file.
+        strategy: *str*
+            search engine name, see generate_solution, or "portfolio"
+            to race the default portfolio.
+        heuristic: *str*
+            heuristic name, see generate_solution.
+        max_nodes: *int or None*
+            node budget of the search.
+        max_visited: *int or None*
+            visited set budget of the search.
+        time_limit: *float or None*
+            wall-clock seconds the search may run for.
+        connection: *Connection*
+            write end of the pipe to the batch process.
+
+    **Returns**
+
+        None.
+    '''
+    # a timed out worker is terminated, exiting lets it stop the processes it started
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(1))
+    start = time.time()
+    stats = Search_Stats(max_nodes, time_limit=time_limit, max_visited=max_visited)
+    record = {"level": level, "status": None, "pushes": None}
+    try:
+        board, player_initial, target_list = load_unit_test(level)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if strategy == "portfolio":
+                solution, record["winner"] = solve_portfolio(board, target_list, player_initial, stats=stats)
+            else:
+                solution = generate_solution(board, target_list, player_initial, strategy=strategy,
+                                             heuristic=heuristic, stats=stats)
+        if solution == GAME_UNFINISHED:
+            record["status"] = "timeout" if stats.stop_reason == "time_limit" else stats.stop_reason
+        elif solution == GAME_FAILED:
+            record["status"] = "failed"
+        else:
+            record["status"] = "solved"
+            record["pushes"] = len(solution)
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = repr(error)
+    record["nodes"] = stats.nodes
+    record["stats"] = stats.summary()
+    record["time"] = round(time.time() - start, 3)
+    record["peak_rss_kb"] = None
+    if resource is not None:
+        # the "hdastar" strategy searches in processes of its own
+        record["peak_rss_kb"] = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    connection.send(record)
+    connection.close()
+
+
+def solve_batch(level_list, processes=None, time_limit=None, max_nodes=None, max_visited=None,
+                strategy="dfs", heuristic="assignment", output=sys.stdout):
+    '''
+    This function solves the levels in parallel and streams the records.
+
+    **Parameters**
+
+        level_list: *list*
+            paths of the level files.
+        processes: *int, optional*
+            number of levels solved at once, the CPU count by default.
+        time_limit: *float, optional*
+            wall-clock seconds allowed per level, unlimited by default.
+        max_nodes: *int, optional*
+            states one level may expand, unlimited by default.
+        max_visited: *int, optional*
+            states the visited set of one level may hold, unlimited by default.
+        strategy: *str*
+            search engine name, see generate_solution.
+        heuristic: *str*
+            heuristic name, see generate_solution.
+        output: *file*
+            where the JSON lines are written.
+
+    **Returns**
+
+        record_list: *list*
+            one record per level, in the order they finished.
+    '''
+    if processes is None:
+        processes = os.cpu_count() or 1
+    waiting_list = list(reversed(level_list))
+    # connection -> (process, level, start time)
+    running_dict = {}
+    record_list = []
+
+    def finish(record):
+        record_list.append(record)
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+
+    while len(waiting_list) > 0 or len(running_dict) > 0:
+        while len(waiting_list) > 0 and len(running_dict) < processes:
+            level = waiting_list.pop()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=solve_level,
+                                              args=(level, strategy, heuristic, max_nodes, max_visited,
+                                                    time_limit, sender))
+            process.start()
+            sender.close()
+            running_dict[receiver] = (process, level, time.time())
+
+        timeout = None
+        if time_limit is not None:
+            earliest = min(start for _, _, start in running_dict.values())
+            timeout = max(0.0, earliest + time_limit + KILL_GRACE - time.time())
+        for receiver in wait(list(running_dict), timeout):
+            process, level, start = running_dict.pop(receiver)
+            try:
+                record = receiver.recv()
+            except EOFError:
+                # the worker died without a word, killed or out of memory
+                record = {"level": level, "status": "error", "pushes": None, "nodes": None,
+                          "stats": None, "time": round(time.time() - start, 3), "peak_rss_kb": None,
+                          "error": "worker exited with code %s" % process.exitcode}
+            receiver.close()
+            process.join()
+            finish(record)
+
+        if time_limit is not None:
+            now = time.time()
+            for receiver, (process, level, start) in list(running_dict.items()):
+                if now - start >= time_limit + KILL_GRACE:
+                    process.terminate()
+                    process.join()
+                    receiver.close()
+                    del running_dict[receiver]
+                    finish({"level": level, "status": "timeout", "pushes": None, "nodes": None,
+                            "stats": None, "time": round(now - start, 3), "peak_rss_kb": None})
+
+    return record_list
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve many push box levels in parallel.")
+    parser.add_argument("levels", help="directory of .data files or a glob pattern")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per level")
+    parser.add_argument("--max-nodes", type=int, default=None, help="expanded states per level")
+    parser.add_argument("--max-visited", type=int, default=None, help="visited states per level")
+    parser.add_argument("--strategy", default="dfs")
+    parser.add_argument("--heuristic", default="assignment")
+    arguments = parser.parse_args()
+
+    solve_batch(find_level_files(arguments.levels), processes=arguments.processes,
+                time_limit=arguments.time_limit, max_nodes=arguments.max_nodes,
+                max_visited=arguments.max_visited, strategy=arguments.strategy, heuristic=arguments.heuristic)
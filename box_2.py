@@ -1,22 +1,7 @@
-import time
 from PIL import Image
-import random
-
-# DEFINE THINGS
-BOX = 8
-WALL = 0
-PATH = 1
-PLAYER = 9
-VALID_PATH = 2
-INVALID_PATH = 3
-ENDPOINT = 4
-
-LEFT = 11
-RIGHT = 22
-UP = 33
-DOWN = 44
-
-GAME_SOLVED = 111
+from box_common import (BOX, WALL, PATH, PLAYER, VALID_PATH, INVALID_PATH, ENDPOINT,
+                        LEFT, RIGHT, UP, DOWN)
+from reachability import player_reachable_region
 
 COLORS = {
     WALL: (0, 0, 0),
@@ -191,72 +176,8 @@ def right(point):
     return (point[0] + 1, point[1])
 
 
-def generate_valid_move_list_for_solving(current_point, maze):
-    '''
-    This function is to create a list for further randomly choosing one step
-    to go ahead, only when solving the maze.
-    In this case, we need to know all eligible moves.
-
-    **Parameters**
-
-        current_point: *tuple*
-            Current point coordinate.
-        maze: *list*
-
-    **Returns**
-
-        valid_move_list: *list*
-            Potential move collected.
-    '''
-    valid_move_list = []
-    if valid_move_check_for_solving(up(current_point), maze) is True:
-        valid_move_list.append(up(current_point))
-    if valid_move_check_for_solving(down(current_point), maze) is True:
-        valid_move_list.append(down(current_point))
-    if valid_move_check_for_solving(left(current_point), maze) is True:
-        valid_move_list.append(left(current_point))
-    if valid_move_check_for_solving(right(current_point), maze) is True:
-        valid_move_list.append(right(current_point))
-    return valid_move_list
-
-
-def valid_move_check_for_solving(point, maze):
-    if maze[point[-1]][point[0]] == PATH:
-        return True
-    else:
-        return False
-
-
 def check_player_connectivity(board_map, player_start, player_destination):
-    maze = []
-    for row in board_map:
-        maze.append([element for element in row])
-
-    stack = [player_start]
-
-    # blockSize = load_maze(filename)[-1]
-
-    x, y = stack[-1]
-    maze[y][x] = VALID_PATH
-
-    if stack[-1] == player_destination:
-        return True
-
-    while len(stack) > 0:
-        if generate_valid_move_list_for_solving(stack[-1], maze) != []:
-            stack.append(random.choice(generate_valid_move_list_for_solving(stack[-1], maze)))
-            if stack[-1] == player_destination:
-                return True
-            else:
-                pass
-            x, y = stack[-1]
-            maze[y][x] = VALID_PATH
-        else:
-            x, y = stack[-1]
-            maze[y][x] = INVALID_PATH
-            stack.pop()
-
-    return False
+    return player_destination in player_reachable_region(board_map, player_start)
 
 
 def generate_valid_push_move_list(board_status):
@@ -264,9 +185,11 @@ def generate_valid_push_move_list(board_status):
     player_location = board_status[-1]
     valid_push_move_list = []
 
+    # one flood fill answers every push candidate of every box
+    region = player_reachable_region(board_map, player_location)
     box_list = retrieve_box_coordinate(board_map)
     for box in box_list:
-        if check_player_connectivity(board_map, player_location, right(box)) is True:
+        if right(box) in region:
             if retrieve_block(board_map, left(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, LEFT))
                 print("LEFT YES!!")
@@ -274,7 +197,7 @@ def generate_valid_push_move_list(board_status):
                 pass
         else:
             pass
-        if check_player_connectivity(board_map, player_location, left(box)) is True:
+        if left(box) in region:
             if retrieve_block(board_map, right(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, RIGHT))
                 print("RIGHT YES!!")
@@ -282,7 +205,7 @@ def generate_valid_push_move_list(board_status):
                 pass
         else:
             pass
-        if check_player_connectivity(board_map, player_location, down(box)) is True:
+        if down(box) in region:
             if retrieve_block(board_map, up(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, UP))
                 print("UP YES!!")
@@ -290,7 +213,7 @@ def generate_valid_push_move_list(board_status):
                 pass
         else:
             pass
-        if check_player_connectivity(board_map, player_location, up(box)) is True:
+        if up(box) in region:
             if retrieve_block(board_map, down(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, DOWN))
                 print("DOWN YES!!")
@@ -1,22 +1,14 @@
 from PIL import Image
-import random
-
-# DEFINE THINGS
-BOX = 8
-WALL = 0
-PATH = 1
-PLAYER = 9
-VALID_PATH = 2
-INVALID_PATH = 3
-ENDPOINT = 4
-
-LEFT = 11
-RIGHT = 22
-UP = 33
-DOWN = 44
-
-GAME_SOLVED = 111
-GAME_FAILED = 222
+from box_common import (BOX, WALL, PATH, PLAYER, VALID_PATH, INVALID_PATH, ENDPOINT,
+                        LEFT, RIGHT, UP, DOWN, GAME_FAILED, GAME_UNFINISHED)
+from reachability import player_reachable_region, Region_Cache, DEFAULT_REGION_CACHE_SIZE
+from compact_board import Compact_Board, Compact_State
+from heuristics import HEURISTICS
+from search_engine import SEARCH_STRATEGIES
+from move_ordering import DEFAULT_MOVE_ORDERING
+from search_stats import Search_Stats, Search_Exhausted
+from checkpoint import DEFAULT_CHECKPOINT_INTERVAL
+from animation_export import open_animation, DEFAULT_FRAME_DURATION
 
 COLORS = {
     WALL: (0, 0, 0),
@@ -77,17 +69,80 @@ def save_maze(maze, blockSize=20, basename="maze"):
 
         None
     '''
+    img = render_maze(maze, blockSize)
+    img.save("step_%s.png"
+             % (basename))
+
+
+class Maze_Renderer():
+    '''
+    Keeps the last frame drawn and repaints only the blocks rewritten since,
+    the ones rewrite_board, update and retrospect put in its dirty_set.
+    '''
+
+    def __init__(self, blockSize=20):
+        self.blockSize = blockSize
+        self.image = None
+        self.dirty_set = set()
+
+    def render(self, maze):
+        '''
+        This function brings the frame up to date with the maze: all of
+        it the first time, then only the dirty blocks.
+
+        **Parameters**
+
+            maze: *list*
+                The maze we want to draw.
+
+        **Returns**
+
+            img: *Image*
+                the frame, the same image every time, so it must be saved
+                or encoded before the next render.
+        '''
+        blockSize = self.blockSize
+        if self.image is None:
+            self.image = render_maze(maze, blockSize)
+        else:
+            for x, y in self.dirty_set:
+                self.image.paste(COLORS[maze[y][x]],
+                                 (x * blockSize, y * blockSize, (x + 1) * blockSize, (y + 1) * blockSize))
+        self.dirty_set.clear()
+        return self.image
+
+
+def render_maze(maze, blockSize=20):
+    '''
+    This function draws the maze as an image. Every block is first one
+    pixel of its color, then the image is scaled up so each pixel becomes
+    a blockSize square, which gives the same pixels as painting every
+    block with set_color.
+
+    **Parameters**
+
+        maze: *list*
+            The maze we want to draw.
+        blockSize: *int*
+            Side of a block in pixels.
+
+    **Returns**
+
+        img: *Image*
+            the drawn maze.
+    '''
     w_blocks = len(maze[0])
     h_blocks = len(maze)
-    SIZE = (w_blocks * blockSize, h_blocks * blockSize)
-    img = Image.new("RGB", SIZE, color=COLORS[WALL])
+    color_bytes = {block_ID: bytes(color) for block_ID, color in COLORS.items()}
+    pixels = bytearray()
+    for row in maze:
+        row = row[:w_blocks]
+        pixels += b"".join(color_bytes[block_ID] for block_ID in row)
+        # a short row leaves the rest of the line as wall, like the background of save_maze
+        pixels += color_bytes[WALL] * (w_blocks - len(row))
 
-    for y, row in enumerate(maze):
-        for x, block_ID in enumerate(row):
-            set_color(img, x, y, blockSize, COLORS[block_ID])
-
-    img.save("step_%s.png"
-             % (basename))
+    img = Image.frombytes("RGB", (w_blocks, h_blocks), bytes(pixels))
+    return img.resize((w_blocks * blockSize, h_blocks * blockSize), Image.NEAREST)
 
 
 def up(point):
@@ -153,60 +208,11 @@ def right(point):
     return (point[0] + 1, point[1])
 
 
-def generate_valid_move_list_for_solving(current_point, maze):
-    '''
-    This function is to create a list for further randomly choosing one step
-    to go ahead, only when solving the maze.
-    In this case, we need to know all eligible moves.
-
-    **Parameters**
-
-        current_point: *tuple*
-            Current point coordinate.
-        maze: *list*
-
-    **Returns**
-
-        valid_move_list: *list*
-            Potential move collected.
-    '''
-    valid_move_list = []
-    if valid_move_check_for_solving(up(current_point), maze) is True:
-        valid_move_list.append(up(current_point))
-    if valid_move_check_for_solving(down(current_point), maze) is True:
-        valid_move_list.append(down(current_point))
-    if valid_move_check_for_solving(left(current_point), maze) is True:
-        valid_move_list.append(left(current_point))
-    if valid_move_check_for_solving(right(current_point), maze) is True:
-        valid_move_list.append(right(current_point))
-    return valid_move_list
-
-
-def valid_move_check_for_solving(point, maze):
-    '''
-    This function simply checkes whether the block corresponding to the point is PATH or not.
-
-    **Parameters**
-
-        point: *tuple*
-            point coordinate.
-        maze: *list*
-
-    **Returns**
-
-        result: *boolean*
-            yes or no.
-    '''
-    if maze[point[-1]][point[0]] == PATH:
-        return True
-    else:
-        return False
-
-
 def check_player_connectivity(board_map, player_start, player_destination):
     '''
     This function perform solely a thing:
     to check, for the given board map, whether the player can move from one location to the other.
+    The answer comes from the flood filled reachable region, so it is deterministic.
 
     **Parameters**
 
@@ -222,38 +228,10 @@ def check_player_connectivity(board_map, player_start, player_destination):
         valid_move_list: *boolean*
             can move to the desired point or not.
     '''
-    maze = []
-    for row in board_map:
-        maze.append([element for element in row])
-
-    stack = [player_start]
+    return player_destination in player_reachable_region(board_map, player_start)
 
-    # blockSize = load_maze(filename)[-1]
 
-    x, y = stack[-1]
-    maze[y][x] = VALID_PATH
-
-    if stack[-1] == player_destination:
-        return True
-
-    while len(stack) > 0:
-        if generate_valid_move_list_for_solving(stack[-1], maze) != []:
-            stack.append(random.choice(generate_valid_move_list_for_solving(stack[-1], maze)))
-            if stack[-1] == player_destination:
-                return True
-            else:
-                pass
-            x, y = stack[-1]
-            maze[y][x] = VALID_PATH
-        else:
-            x, y = stack[-1]
-            maze[y][x] = INVALID_PATH
-            stack.pop()
-
-    return False
-
-
-def generate_valid_push_move_list(board_status):
+def generate_valid_push_move_list(board_status, region=None):
     '''
     This function generates a list of all the valid push move for a given board status.
     That is, a board status consists of the current map and current player location.
@@ -263,6 +241,8 @@ def generate_valid_push_move_list(board_status):
         board status: *list*
             Current board status.
             first thing in list is map, second is player location.
+        region: *set, optional*
+            player reachable region, when it is already known.
 
     **Returns**
 
@@ -273,30 +253,33 @@ def generate_valid_push_move_list(board_status):
     player_location = board_status[-1]
     valid_push_move_list = []
 
+    # one flood fill answers every push candidate of every box
+    if region is None:
+        region = player_reachable_region(board_map, player_location)
     box_list = retrieve_box_coordinate(board_map)
     for box in box_list:
-        if check_player_connectivity(board_map, player_location, right(box)) is True:
+        if right(box) in region:
             if retrieve_block(board_map, left(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, LEFT))
             else:
                 pass
         else:
             pass
-        if check_player_connectivity(board_map, player_location, left(box)) is True:
+        if left(box) in region:
             if retrieve_block(board_map, right(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, RIGHT))
             else:
                 pass
         else:
             pass
-        if check_player_connectivity(board_map, player_location, down(box)) is True:
+        if down(box) in region:
             if retrieve_block(board_map, up(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, UP))
             else:
                 pass
         else:
             pass
-        if check_player_connectivity(board_map, player_location, up(box)) is True:
+        if up(box) in region:
             if retrieve_block(board_map, down(box)) == PATH:
                 valid_push_move_list.append(Push_Move(box, DOWN))
             else:
@@ -355,7 +338,7 @@ def retrieve_block(board_map, coordinate):
     return board_map[y][x]
 
 
-def rewrite_board(board_map, writing_point, writing_value):
+def rewrite_board(board_map, writing_point, writing_value, dirty_set=None):
     '''
     This function is to update the board map by
     rewriting values in the map.
@@ -368,6 +351,8 @@ def rewrite_board(board_map, writing_point, writing_value):
             the point we want to write at.
         writing_value: *int*
             the value we want to write in.
+        dirty_set: *set, optional*
+            collects the rewritten points for Maze_Renderer.
 
     **Returns**
 
@@ -376,6 +361,8 @@ def rewrite_board(board_map, writing_point, writing_value):
     x = writing_point[0]
     y = writing_point[-1]
     board_map[y][x] = writing_value
+    if dirty_set is not None:
+        dirty_set.add((x, y))
 
 
 class Push_Move():
@@ -391,7 +378,7 @@ class Push_Move():
         self.direction = push_direction
 
 
-def update(board_status, push_move):
+def update(board_status, push_move, dirty_set=None):
     '''
     This function updates the board status after a given push move.
     Update two things: the board map and the player location after the move.
@@ -402,6 +389,8 @@ def update(board_status, push_move):
             Current board_status.
         push_move: *Push_Move*
             unit move.
+        dirty_set: *set, optional*
+            collects the rewritten points for Maze_Renderer.
 
     **Returns**
 
@@ -412,29 +401,29 @@ def update(board_status, push_move):
     if push_move.direction == LEFT:
         board_status.append((push_move.box[0], push_move.box[-1]))
 
-        rewrite_board(board_status[0], push_move.box, PATH)
-        rewrite_board(board_status[0], left(push_move.box), BOX)
+        rewrite_board(board_status[0], push_move.box, PATH, dirty_set)
+        rewrite_board(board_status[0], left(push_move.box), BOX, dirty_set)
 
     elif push_move.direction == RIGHT:
         board_status.append((push_move.box[0], push_move.box[-1]))
 
-        rewrite_board(board_status[0], push_move.box, PATH)
-        rewrite_board(board_status[0], right(push_move.box), BOX)
+        rewrite_board(board_status[0], push_move.box, PATH, dirty_set)
+        rewrite_board(board_status[0], right(push_move.box), BOX, dirty_set)
 
     elif push_move.direction == UP:
         board_status.append((push_move.box[0], push_move.box[-1]))
 
-        rewrite_board(board_status[0], push_move.box, PATH)
-        rewrite_board(board_status[0], up(push_move.box), BOX)
+        rewrite_board(board_status[0], push_move.box, PATH, dirty_set)
+        rewrite_board(board_status[0], up(push_move.box), BOX, dirty_set)
 
     else:
         board_status.append((push_move.box[0], push_move.box[-1]))
 
-        rewrite_board(board_status[0], push_move.box, PATH)
-        rewrite_board(board_status[0], down(push_move.box), BOX)
+        rewrite_board(board_status[0], push_move.box, PATH, dirty_set)
+        rewrite_board(board_status[0], down(push_move.box), BOX, dirty_set)
 
 
-def retrospect(board_status, push_move):
+def retrospect(board_status, push_move, dirty_set=None):
     '''
     This function retrospects the board status before a given push move.
     Retrospect two things: the board map and the player location before the move.
@@ -445,6 +434,8 @@ def retrospect(board_status, push_move):
             Current board_status.
         push_move: *Push_Move*
             unit move.
+        dirty_set: *set, optional*
+            collects the rewritten points for Maze_Renderer.
 
     **Returns**
 
@@ -455,31 +446,37 @@ def retrospect(board_status, push_move):
     if push_move.direction == LEFT:
         board_status.append((right(push_move.box)[0], right(push_move.box)[-1]))
 
-        rewrite_board(board_status[0], push_move.box, BOX)
-        rewrite_board(board_status[0], left(push_move.box), PATH)
+        rewrite_board(board_status[0], push_move.box, BOX, dirty_set)
+        rewrite_board(board_status[0], left(push_move.box), PATH, dirty_set)
 
     elif push_move.direction == RIGHT:
         board_status.append((right(push_move.box)[0], right(push_move.box)[-1]))
 
-        rewrite_board(board_status[0], push_move.box, BOX)
-        rewrite_board(board_status[0], right(push_move.box), PATH)
+        rewrite_board(board_status[0], push_move.box, BOX, dirty_set)
+        rewrite_board(board_status[0], right(push_move.box), PATH, dirty_set)
 
     elif push_move.direction == UP:
         board_status.append((right(push_move.box)[0], right(push_move.box)[-1]))
 
-        rewrite_board(board_status[0], push_move.box, BOX)
-        rewrite_board(board_status[0], up(push_move.box), PATH)
+        rewrite_board(board_status[0], push_move.box, BOX, dirty_set)
+        rewrite_board(board_status[0], up(push_move.box), PATH, dirty_set)
 
     else:
         board_status.append((right(push_move.box)[0], right(push_move.box)[-1]))
 
-        rewrite_board(board_status[0], push_move.box, BOX)
-        rewrite_board(board_status[0], down(push_move.box), PATH)
+        rewrite_board(board_status[0], push_move.box, BOX, dirty_set)
+        rewrite_board(board_status[0], down(push_move.box), PATH, dirty_set)
 
 
-def generate_solution(board, target_list, player_initial):
+def generate_solution(board, target_list, player_initial, strategy="dfs", heuristic="assignment",
+                      move_ordering=DEFAULT_MOVE_ORDERING, macro_moves=None, stats=None, processes=None,
+                      transposition_memory=None, spill_directory=None,
+                      region_cache_size=DEFAULT_REGION_CACHE_SIZE, checkpoint=None,
+                      checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, resume=False):
     '''
     This function is the main body, which finds the solution for a given config.
+    The search itself runs on the compact board, so every stored state is
+    only a key and every push is applied and undone by flipping two bits.
 
     **Parameters**
 
@@ -489,101 +486,148 @@ def generate_solution(board, target_list, player_initial):
             contains all the target location for boxes.
         player_initial: *tuple*
             player initial location.
+        strategy: *str*
+            search engine, one of "dfs", "astar", "idastar", "bidirectional",
+            "hdastar" or "external".
+        heuristic: *str or function*
+            lower bound used by "astar" and "idastar",
+            a name in heuristics.HEURISTICS or a heuristic function.
+        move_ordering: *tuple*
+            criteria to sort the pushes of "dfs" by, see move_ordering.py,
+            an empty tuple keeps the generation order.
+        macro_moves: *boolean, optional*
+            whether tunnel and goal room pushes are taken as one move,
+            see macro_moves.py. None turns them on for "dfs" only, as they
+            can cost "astar" and "idastar" the push optimal solution.
+        stats: *Search_Stats, optional*
+            counters, phase times, progress reports and budgets of the
+            search, see search_stats.py. Once a budget is spent the search
+            stops and its stop_reason tells which one.
+        processes: *int, optional*
+            worker processes of "hdastar", the CPU count by default.
+        transposition_memory: *int, optional*
+            bytes of the transposition table of "idastar",
+            see transposition_table.py.
+        spill_directory: *str, optional*
+            where "external" keeps its files, see external_search.py.
+        region_cache_size: *int*
+            box layouts whose player regions are kept for reuse,
+            0 floods every region afresh, see reachability.Region_Cache.
+        checkpoint: *str, optional*
+            file "dfs" saves its search to, see checkpoint.py.
+        checkpoint_interval: *float*
+            wall-clock seconds between two checkpoints.
+        resume: *boolean*
+            whether "dfs" goes on from the checkpoint file when there is one.
 
     **Returns**
 
         stack_move: *list*
-            all the unit moves for solution collected.
-    '''
-    target_list = target_list
+            all the unit moves for solution collected, GAME_FAILED when
+            there is none, GAME_UNFINISHED when a budget ran out first.
+    '''
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError("unknown search strategy %r" % (strategy,))
+    if checkpoint is not None and strategy != "dfs":
+        raise ValueError("only the dfs strategy can be checkpointed")
+    if heuristic in HEURISTICS:
+        heuristic = HEURISTICS[heuristic]
+
+    if stats is None:
+        stats = Search_Stats()
+    with stats.phase("board"):
+        compact_board = Compact_Board(board, target_list)
+        if region_cache_size > 0:
+            compact_board.region_cache = Region_Cache(region_cache_size)
+        state = Compact_State.from_board_map(compact_board, board, player_initial)
+    if state.boxes & compact_board.dead_squares:
+        return GAME_FAILED
+
+    if macro_moves is None:
+        macro_moves = strategy == "dfs"
+    options = {"macro_moves": macro_moves, "stats": stats}
+    if strategy == "dfs":
+        options["move_ordering"] = move_ordering
+        options["checkpoint"] = checkpoint
+        options["checkpoint_interval"] = checkpoint_interval
+        options["resume"] = resume
+    if strategy == "hdastar":
+        options["processes"] = processes
+    if strategy == "idastar" and transposition_memory is not None:
+        options["transposition_memory"] = transposition_memory
+    if strategy == "external":
+        options["spill_directory"] = spill_directory
+    try:
+        with stats.phase("search"):
+            push_list = SEARCH_STRATEGIES[strategy](compact_board, state, heuristic, **options)
+    except Search_Exhausted:
+        return GAME_UNFINISHED
+    finally:
+        stats.region_calls += compact_board.region_calls
+        if compact_board.region_cache is not None:
+            stats.region_cache_hits += compact_board.region_cache.hits
+    if push_list is None:
+        return GAME_FAILED
+
+    print("GAME_SOLVED")
+    return [Push_Move(compact_board.point(cell), direction) for cell, direction in push_list]
+
+
+def resume_solution(board, target_list, player_initial, checkpoint, **options):
+    '''
+    This function goes on with a "dfs" search stopped by a budget or a
+    preemption, from its checkpoint file, and keeps saving to it.
 
-    board_status = [board, player_initial]
-    board_status_list = []
+    **Parameters**
 
-    temp_1 = []
-    temp_2 = (board_status[-1][0], board_status[-1][-1])
-    for row in board_status[0]:
-        temp_1.append([element for element in row])
-    board_status_list.append([temp_1, temp_2])
+        board: *list*
+            Initial board map.
+        target_list: *list*
+            contains all the target location for boxes.
+        player_initial: *tuple*
+            player initial location.
+        checkpoint: *str*
+            checkpoint file of the stopped search.
+        options: *dict*
+            other generate_solution keyword arguments.
 
-    valid_push_move_list = generate_valid_push_move_list(board_status)
+    **Returns**
 
-    stack_move = []
-    stack_possibility = []
-    stack_possibility.append(valid_push_move_list)
+        stack_move: *list*
+            same as generate_solution.
+    '''
+    return generate_solution(board, target_list, player_initial, strategy="dfs",
+                             checkpoint=checkpoint, resume=True, **options)
 
-    stack_move.append(stack_possibility[-1][-1])
-    update(board_status, stack_move[-1])
-    stack_possibility[-1].pop()
 
-    while len(stack_move) > 0:
-        # step 0, reset the repetition_status to False:
-        repetition_status = False
+def solution_image_display(board_initial_status, list_target, stack):
+    '''
+    This function displays the solution in a fun and clear way.
 
-        # step 1, check whether every box is at target location
-        if all(retrieve_block(board_status[0], target) is BOX for target in target_list) is True:
-            print("GAME_SOLVED")
-            return stack_move
-            # return GAME_SOLVED
-        else:
-            pass
+    **Parameters**
 
-        # step 2, check wheher the current board status has occured
-        for archive_board_status in board_status_list:
-            if board_status[0] == archive_board_status[0]:
-                if check_player_connectivity(board_status[0], board_status[-1], archive_board_status[-1]) is True:
-                    repetition_status = True
-                    break
-                else:
-                    pass
-            else:
-                pass
+        board_initial_status: *list*
+            initial board_status.
+        list_target: *list*
+            target list.
+        stack: *list*
+            the right unit moves as the solution.
 
-        if repetition_status is True:
-            retrospect(board_status, stack_move[-1])
-            stack_move.pop()
-            while stack_possibility[-1] == []:
-                retrospect(board_status, stack_move[-1])
-                stack_move.pop()
-                stack_possibility.pop()
-
-            stack_move.append(stack_possibility[-1][-1])
-            update(board_status, stack_move[-1])
-            stack_possibility[-1].pop()
-            continue
-        else:
-            temp_1 = []
-            temp_2 = (board_status[-1][0], board_status[-1][-1])
-            for row in board_status[0]:
-                temp_1.append([element for element in row])
-            board_status_list.append([temp_1, temp_2])
-
-        # step 3 find all the possible pushing moves (if there is any), and put in a list.
-        valid_push_move_list = generate_valid_push_move_list(board_status)
-        if valid_push_move_list == []:
-            retrospect(board_status, stack_move[-1])
-            stack_move.pop()
-            while stack_possibility[-1] == []:
-                retrospect(board_status, stack_move[-1])
-                stack_move.pop()
-                stack_possibility.pop()
-
-            stack_move.append(stack_possibility[-1][-1])
-            update(board_status, stack_move[-1])
-            stack_possibility[-1].pop()
-            continue
-        else:
-            stack_possibility.append(valid_push_move_list)
-            stack_move.append(stack_possibility[-1][-1])
-            update(board_status, stack_move[-1])
-            stack_possibility[-1].pop()
+    **Returns**
 
-    return GAME_FAILED
+        None.
+    '''
+    renderer = Maze_Renderer(blockSize=20)
+    frames = solution_frames(board_initial_status, list_target, stack, renderer.dirty_set)
+    for basename_num, board_map in enumerate(frames):
+        renderer.render(board_map).save("step_%s.png" % (basename_num))
 
 
-def solution_image_display(board_initial_status, list_target, stack):
+def solution_animation_export(board_initial_status, list_target, stack, filename,
+                              duration=DEFAULT_FRAME_DURATION, blockSize=20):
     '''
-    This function displays the solution in a fun and clear way.
+    This function writes the frames of solution_image_display into one
+    animated GIF or APNG file, each frame encoded as soon as it is drawn.
 
     **Parameters**
 
@@ -593,23 +637,55 @@ def solution_image_display(board_initial_status, list_target, stack):
             target list.
         stack: *list*
             the right unit moves as the solution.
+        filename: *str*
+            output file, .gif, .png or .apng.
+        duration: *int*
+            milliseconds each frame is shown.
+        blockSize: *int*
+            Side of a block in pixels.
 
     **Returns**
 
         None.
     '''
+    renderer = Maze_Renderer(blockSize)
+    with open_animation(filename, duration, list(COLORS.values())) as writer:
+        for board_map in solution_frames(board_initial_status, list_target, stack, renderer.dirty_set):
+            writer.add_frame(renderer.render(board_map))
+
+
+def solution_frames(board_initial_status, list_target, stack, dirty_set=None):
+    '''
+    This function plays the solution on the board, two frames per push:
+    the player stepping behind the box, then the push itself.
+
+    **Parameters**
+
+        board_initial_status: *list*
+            initial board_status, it is modified along the way.
+        list_target: *list*
+            target list.
+        stack: *list*
+            the right unit moves as the solution.
+        dirty_set: *set, optional*
+            collects the points rewritten between two frames.
+
+    **Returns**
+
+        frames: *generator*
+            the board map of every frame; it is the same list each time,
+            so it must be drawn before the next frame is asked for.
+    '''
     board_status = board_initial_status
     board_map = board_status[0]
     player_location = board_status[-1]
     for point in list_target:
-        rewrite_board(board_map, point, ENDPOINT)
-    rewrite_board(board_map, player_location, PLAYER)
-
-    basename_num = 0
-    save_maze(board_map, blockSize=20, basename=str(basename_num))
+        rewrite_board(board_map, point, ENDPOINT, dirty_set)
+    rewrite_board(board_map, player_location, PLAYER, dirty_set)
+    yield board_map
 
     for move in stack:
-        rewrite_board(board_map, player_location, PATH)
+        rewrite_board(board_map, player_location, PATH, dirty_set)
         if move.direction == LEFT:
             player_location = right(move.box)
         elif move.direction == RIGHT:
@@ -618,17 +694,15 @@ def solution_image_display(board_initial_status, list_target, stack):
             player_location = down(move.box)
         elif move.direction == DOWN:
             player_location = up(move.box)
-        rewrite_board(board_map, player_location, PLAYER)
-        basename_num = basename_num + 1
-        save_maze(board_map, blockSize=20, basename=str(basename_num))
+        rewrite_board(board_map, player_location, PLAYER, dirty_set)
+        yield board_map
 
-        update(board_status, move)
+        update(board_status, move, dirty_set)
         board_map = board_status[0]
-        rewrite_board(board_map, player_location, PATH)
+        rewrite_board(board_map, player_location, PATH, dirty_set)
         player_location = board_status[-1]
-        rewrite_board(board_map, player_location, PLAYER)
-        basename_num = basename_num + 1
-        save_maze(board_map, blockSize=20, basename=str(basename_num))
+        rewrite_board(board_map, player_location, PLAYER, dirty_set)
+        yield board_map
 
 
 def load_unit_test(filename):
@@ -695,7 +769,9 @@ if __name__ == "__main__":
     player_initial = game_readin[1]
     target_list = game_readin[-1]
 
-    solution = generate_solution(test_board, target_list, player_initial)
+    stats = Search_Stats()
+    solution = generate_solution(test_board, target_list, player_initial, stats=stats)
+    print(stats.report())
     if solution != GAME_FAILED:
         solution_image_display([test_board_backup, player_initial], target_list, solution)
     else:
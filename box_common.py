@@ -0,0 +1,24 @@
+'''
+Shared definitions for the push box solver.
+Block values, push directions and game results are kept here
+so that every module reads the board map the same way.
+'''
+
+# DEFINE THINGS
+BOX = 8
+WALL = 0
+PATH = 1
+PLAYER = 9
+VALID_PATH = 2
+INVALID_PATH = 3
+ENDPOINT = 4
+
+LEFT = 11
+RIGHT = 22
+UP = 33
+DOWN = 44
+
+GAME_SOLVED = 111
+GAME_FAILED = 222
+# the search ran out of a budget or was cancelled before it could tell
+GAME_UNFINISHED = 333
@@ -0,0 +1,142 @@
+'''
+Checkpoints of the depth first search.
+
+A long search can be stopped, by a budget or by a preempted machine, and
+picked up later where it stopped. A checkpoint holds what the backtracker
+cannot rebuild on its own: the moves of the current path, the untried
+moves of every state on it and the keys of the visited states. The board
+itself, the target matching and the player regions are rebuilt on resume
+by walking the saved path again.
+
+The file is written next to its final place and renamed over it, so a
+crash while writing leaves the previous checkpoint whole. Its layout:
+
+    magic:     8 bytes, MAGIC.
+    version:   2 bytes, CHECKPOINT_VERSION.
+    length:    4 bytes, length of the header.
+    header:    JSON, the level fingerprint and the two stacks.
+    keys:      the visited state keys, 8 bytes each, little endian.
+'''
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+
+MAGIC = b"PUSHBOX\x00"
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 300.0
+PREFIX = struct.Struct("<8sHI")
+
+
+class Checkpoint_Error(Exception):
+    '''
+    Raised when a checkpoint cannot be resumed: it is damaged, of another
+    version, or of another level.
+    '''
+
+
+def level_fingerprint(board, state):
+    '''
+    This function names a level with its start, so a checkpoint is never
+    resumed on another one.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state.
+
+    **Returns**
+
+        fingerprint: *str*
+            hexadecimal digest of the walls, targets, boxes and player.
+    '''
+    level = "%d %d %d %d %d" % (board.stride, board.floor, board.targets, state.boxes, state.player)
+    return hashlib.sha256(level.encode()).hexdigest()
+
+
+def save_checkpoint(path, fingerprint, stack_move, stack_possibility, visited_state_set):
+    '''
+    This function writes a checkpoint atomically.
+
+    **Parameters**
+
+        path: *str*
+            checkpoint file.
+        fingerprint: *str*
+            level fingerprint, see level_fingerprint.
+        stack_move: *list*
+            moves of the current path.
+        stack_possibility: *list*
+            untried moves of every state on the path.
+        visited_state_set: *set*
+            keys of the visited states.
+
+    **Returns**
+
+        None.
+    '''
+    header = json.dumps({
+        "level": fingerprint,
+        "stack_move": stack_move,
+        "stack_possibility": stack_possibility,
+    }, separators=(",", ":")).encode()
+    keys = array('Q', visited_state_set)
+    if sys.byteorder == "big":
+        keys.byteswap()
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint_file:
+        checkpoint_file.write(PREFIX.pack(MAGIC, CHECKPOINT_VERSION, len(header)))
+        checkpoint_file.write(header)
+        keys.tofile(checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path, fingerprint):
+    '''
+    This function reads a checkpoint back.
+
+    **Parameters**
+
+        path: *str*
+            checkpoint file.
+        fingerprint: *str*
+            fingerprint of the level being resumed.
+
+    **Returns**
+
+        multiple_result: *tuple*
+            stack_move, stack_possibility and visited_state_set, moves
+            being tuples of (cell, direction) pushes.
+    '''
+    with open(path, "rb") as checkpoint_file:
+        data = checkpoint_file.read()
+    if len(data) < PREFIX.size:
+        raise Checkpoint_Error("%s is not a checkpoint" % path)
+    magic, version, header_length = PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise Checkpoint_Error("%s is not a checkpoint" % path)
+    if version != CHECKPOINT_VERSION:
+        raise Checkpoint_Error("%s is of version %d, not %d" % (path, version, CHECKPOINT_VERSION))
+
+    key_start = PREFIX.size + header_length
+    if len(data) < key_start or (len(data) - key_start) % 8 != 0:
+        raise Checkpoint_Error("%s is cut short" % path)
+    header = json.loads(data[PREFIX.size:key_start])
+    if header["level"] != fingerprint:
+        raise Checkpoint_Error("%s belongs to another level" % path)
+    keys = array('Q', data[key_start:])
+    if sys.byteorder == "big":
+        keys.byteswap()
+
+    stack_move = [tuple(tuple(push) for push in move) for move in header["stack_move"]]
+    stack_possibility = [[tuple(tuple(push) for push in move) for move in move_list]
+                         for move_list in header["stack_possibility"]]
+    return stack_move, stack_possibility, set(keys)
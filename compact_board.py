@@ -0,0 +1,389 @@
+'''
+Compact board representation for the push box solver.
+
+The static part of a level (walls, floor and targets) is stored once in a
+Compact_Board as integer bit masks over flat block indices. A search state
+is then only the box bit mask plus the player's flat index, so applying or
+undoing a push flips two bits instead of rebuilding the board map.
+
+A flat index is y * stride + x. The stride is one wider than the board, the
+extra column always being wall, so shifting a mask by one never wraps a
+block onto the neighbouring row.
+
+States are told apart by a 64 bit Zobrist key: one random number per block
+for a box standing on it and one per block for the normalized player. The
+box part is kept up to date by update and retrospect with one XOR per
+moved box, so a key costs the same whatever the number of boxes.
+'''
+import random
+from collections import deque
+
+from box_common import WALL, BOX, LEFT, RIGHT, UP, DOWN
+from reachability import reachable_mask, repaired_mask
+
+
+DIRECTIONS = (LEFT, RIGHT, UP, DOWN)
+# fixed, so every process searching the same level agrees on the keys
+ZOBRIST_SEED = 20190321
+
+
+def iterate_cells(mask):
+    '''
+    This function walks through the flat indices set in a bit mask,
+    from the lowest index to the highest.
+
+    **Parameters**
+
+        mask: *int*
+            bit mask of blocks.
+
+    **Returns**
+
+        cells: *generator*
+            flat index of every set block.
+    '''
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class Compact_Board():
+    '''
+    The static part of a level: wall/floor mask, target mask,
+    the precomputed neighbour offset table and push distances.
+    '''
+
+    def __init__(self, board_map, target_list):
+        self.height = len(board_map)
+        self.width = max(len(row) for row in board_map)
+        self.stride = self.width + 1
+        self.size = self.stride * self.height
+        self.offsets = {
+            LEFT: -1,
+            RIGHT: 1,
+            UP: -self.stride,
+            DOWN: self.stride,
+        }
+
+        self.floor = 0
+        for y, row in enumerate(board_map):
+            for x, block in enumerate(row):
+                if block != WALL:
+                    self.floor |= 1 << self.index((x, y))
+
+        self.targets = 0
+        for target in target_list:
+            self.targets |= 1 << self.index(target)
+
+        # boxes beyond one per target never have to reach a target,
+        # so they may be parked anywhere, dead squares included
+        box_count = sum(row.count(BOX) for row in board_map)
+        self.spare_boxes = max(0, box_count - bin(self.targets).count("1"))
+
+        # target_reach[cell] is the bit mask of the targets a box on cell
+        # can be pushed onto; floor blocks reaching no target are dead,
+        # unless there are spare boxes.
+        self.push_distances = find_push_distances(self)
+        self.target_reach = [0] * self.size
+        for target, distance in self.push_distances.items():
+            for cell in iterate_cells(self.floor):
+                if distance[cell] is not None:
+                    self.target_reach[cell] |= 1 << target
+        self.dead_squares = 0
+        for cell in iterate_cells(self.floor):
+            if self.target_reach[cell] == 0 and self.spare_boxes == 0:
+                self.dead_squares |= 1 << cell
+
+        # push_table[cell] lists (direction, behind, destination) for every
+        # push of a box standing on cell that is not blocked by a wall
+        # and does not send the box onto a dead square.
+        self.push_table = [() for _ in range(self.size)]
+        for cell in iterate_cells(self.floor):
+            pushes = []
+            for direction in DIRECTIONS:
+                offset = self.offsets[direction]
+                behind = cell - offset
+                destination = cell + offset
+                if self.is_floor(behind) and self.is_floor(destination) \
+                        and not (self.dead_squares >> destination) & 1:
+                    pushes.append((direction, behind, destination))
+            self.push_table[cell] = tuple(pushes)
+
+        # set by the caller to a reachability.Region_Cache to share regions between states
+        self.region_cache = None
+        self.region_calls = 0
+
+        generator = random.Random(ZOBRIST_SEED)
+        self.box_zobrist = [generator.getrandbits(64) for _ in range(self.size)]
+        self.player_zobrist = [generator.getrandbits(64) for _ in range(self.size)]
+
+    def index(self, point):
+        return point[-1] * self.stride + point[0]
+
+    def point(self, cell):
+        return (cell % self.stride, cell // self.stride)
+
+    def is_floor(self, cell):
+        return 0 <= cell < self.size and (self.floor >> cell) & 1 == 1
+
+
+def find_push_distances(board):
+    '''
+    This function counts, for every target and every floor block, how many
+    pushes it takes to bring a box from the block onto the target when no
+    other box is on the board. Boxes are pulled backwards from the target,
+    the player standing behind the pulled box.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level, floor, targets and offsets must be set.
+
+    **Returns**
+
+        push_distances: *dict*
+            target flat index -> list of pushes per flat index,
+            None where the target can not be reached.
+    '''
+    push_distances = {}
+    for target in iterate_cells(board.targets):
+        distance = [None] * board.size
+        distance[target] = 0
+        queue = deque([target])
+        while len(queue) > 0:
+            cell = queue.popleft()
+            for offset in board.offsets.values():
+                # the box came from previous, pushed by a player standing behind it
+                previous = cell - offset
+                behind = previous - offset
+                if board.is_floor(previous) and board.is_floor(behind) \
+                        and distance[previous] is None:
+                    distance[previous] = distance[cell] + 1
+                    queue.append(previous)
+        push_distances[target] = distance
+    return push_distances
+
+
+class Compact_State():
+    '''
+    This is the dynamic part of a level during the search:
+    the box bit mask, the player flat index and the Zobrist key of the boxes.
+    '''
+    __slots__ = ('board', 'boxes', 'player', 'zobrist')
+
+    def __init__(self, board, boxes, player, zobrist=None):
+        self.board = board
+        self.restore(boxes, player, zobrist)
+
+    def restore(self, boxes, player, zobrist=None):
+        '''
+        This function puts the state on stored boxes and player. The
+        Zobrist key is computed from the boxes when it was not stored.
+
+        **Parameters**
+
+            boxes: *int*
+                box bit mask.
+            player: *int*
+                player flat index.
+            zobrist: *int, optional*
+                Zobrist key of the boxes.
+
+        **Returns**
+
+            None.
+        '''
+        if zobrist is None:
+            zobrist = 0
+            for cell in iterate_cells(boxes):
+                zobrist ^= self.board.box_zobrist[cell]
+        self.boxes = boxes
+        self.player = player
+        self.zobrist = zobrist
+
+    @classmethod
+    def from_board_map(cls, board, board_map, player_location):
+        boxes = 0
+        for y, row in enumerate(board_map):
+            for x, block in enumerate(row):
+                if block == BOX:
+                    boxes |= 1 << board.index((x, y))
+        return cls(board, boxes, board.index(player_location))
+
+    def update(self, cell, direction):
+        '''
+        This function applies a push of the box standing on cell.
+        The player ends on the block the box left.
+
+        **Parameters**
+
+            cell: *int*
+                flat index of the pushed box.
+            direction: *int*
+                pushing direction.
+
+        **Returns**
+
+            None.
+        '''
+        destination = cell + self.board.offsets[direction]
+        self.boxes ^= (1 << cell) | (1 << destination)
+        self.zobrist ^= self.board.box_zobrist[cell] ^ self.board.box_zobrist[destination]
+        self.player = cell
+
+    def retrospect(self, cell, direction):
+        '''
+        This function undoes a push applied by update.
+        The player goes back behind the box.
+
+        **Parameters**
+
+            cell: *int*
+                flat index the box stood on before the push.
+            direction: *int*
+                pushing direction.
+
+        **Returns**
+
+            None.
+        '''
+        offset = self.board.offsets[direction]
+        self.boxes ^= (1 << cell) | (1 << (cell + offset))
+        self.zobrist ^= self.board.box_zobrist[cell] ^ self.board.box_zobrist[cell + offset]
+        self.player = cell - offset
+
+    def apply_move(self, move):
+        for cell, direction in move:
+            self.update(cell, direction)
+
+    def undo_move(self, move):
+        for cell, direction in reversed(move):
+            self.retrospect(cell, direction)
+
+    def reachable_region(self, region=None, move=()):
+        '''
+        This function gives the blocks the player can reach, from the
+        region cache of the board when it has one.
+
+        **Parameters**
+
+            region: *int, optional*
+                region before move, it is then repaired push by push
+                instead of flooding the board again.
+            move: *tuple*
+                (cell, direction) pushes just applied to the state.
+
+        **Returns**
+
+            region: *int*
+                bit mask of the reachable blocks.
+        '''
+        board = self.board
+        board.region_calls += 1
+        cache = board.region_cache
+        if cache is not None:
+            cached = cache.lookup(self.boxes, self.zobrist, self.player)
+            if cached is not None:
+                return cached
+
+        if region is None:
+            region = reachable_mask(self.player, board.floor & ~self.boxes, board.stride)
+        else:
+            # the boxes before the move, then again after each of its pushes
+            toggle_list = [(1 << cell) | (1 << (cell + board.offsets[direction])) for cell, direction in move]
+            boxes = self.boxes
+            for toggle in toggle_list:
+                boxes ^= toggle
+            for (cell, direction), toggle in zip(move, toggle_list):
+                boxes ^= toggle
+                region = repaired_mask(region, cell, cell + board.offsets[direction],
+                                       board.floor & ~boxes, board.stride)
+
+        if cache is not None:
+            cache.store(self.boxes, self.zobrist, region)
+        return region
+
+    def state_key(self, region):
+        '''
+        This function builds a hashable key for the state: the Zobrist key
+        of the boxes combined with the one of the lowest flat index of the
+        player reachable region. Two states sharing a key are taken as the
+        same; with 64 bits that is vanishingly unlikely to happen by chance.
+
+        **Parameters**
+
+            region: *int*
+                player reachable region as a bit mask.
+
+        **Returns**
+
+            state_key: *int*
+                the canonical 64 bit key.
+        '''
+        normalized_player = (region & -region).bit_length() - 1
+        return self.zobrist ^ self.board.player_zobrist[normalized_player]
+
+    def is_solved(self):
+        return self.boxes & self.board.targets == self.board.targets
+
+
+def generate_push_list(state, region):
+    '''
+    This function generates every valid push for a compact state.
+    A push is valid when the player can reach the block behind the box
+    and the destination block is free floor.
+
+    **Parameters**
+
+        state: *Compact_State*
+            Current state.
+        region: *int*
+            player reachable region as a bit mask.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) for every valid push.
+    '''
+    push_list = []
+    boxes = state.boxes
+    push_table = state.board.push_table
+    for cell in iterate_cells(boxes):
+        for direction, behind, destination in push_table[cell]:
+            if (region >> behind) & 1 and not (boxes >> destination) & 1:
+                push_list.append((cell, direction))
+    return push_list
+
+
+def generate_pull_list(state, region):
+    '''
+    This function generates every valid pull for a compact state, for the
+    search that runs backward from the targets. The player stands on the
+    block the box is pulled onto and steps back one more block, which must
+    be free floor.
+
+    A pull is given as the push it undoes, so Compact_State.retrospect
+    applies it and Compact_State.update takes it back.
+
+    **Parameters**
+
+        state: *Compact_State*
+            Current state.
+        region: *int*
+            player reachable region as a bit mask.
+
+    **Returns**
+
+        pull_list: *list*
+            (cell, direction) of the push undone by every valid pull.
+    '''
+    pull_list = []
+    board = state.board
+    for box in iterate_cells(state.boxes):
+        for direction, offset in board.offsets.items():
+            cell = box - offset
+            behind = cell - offset
+            if board.is_floor(behind) and (region >> cell) & 1 and not (state.boxes >> behind) & 1:
+                pull_list.append((cell, direction))
+    return pull_list
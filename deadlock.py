@@ -0,0 +1,174 @@
+'''
+Dynamic deadlock detection for the push box solver.
+
+Static dead squares are already removed from the push table of the
+Compact_Board. The checks here look at the other boxes as well, and only
+around the box that has just been pushed, so they cost a handful of bit
+tests per node.
+'''
+from box_common import LEFT, RIGHT, UP, DOWN
+
+
+def is_deadlock(board, boxes, cell):
+    '''
+    This function tells whether the box that has just been pushed onto cell
+    leaves the board in a state that can never be solved. A stuck box is
+    only fatal when every box needs a target, so levels with spare boxes
+    are never cut here.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        boxes: *int*
+            box bit mask after the push.
+        cell: *int*
+            flat index the box was pushed onto.
+
+    **Returns**
+
+        result: *boolean*
+            yes or no.
+    '''
+    if board.spare_boxes > 0:
+        return False
+    return is_square_deadlock(board, boxes, cell) or is_freeze_deadlock(board, boxes, cell)
+
+
+def is_square_deadlock(board, boxes, cell):
+    '''
+    This function checks the four 2x2 squares that contain cell.
+    A square made only of walls and boxes can never be broken up,
+    so it is a deadlock as soon as one of its boxes is off target.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        boxes: *int*
+            box bit mask.
+        cell: *int*
+            flat index of the pushed box.
+
+    **Returns**
+
+        result: *boolean*
+            yes or no.
+    '''
+    blocked = ~board.floor | boxes
+    stride = board.stride
+    for corner in (cell, cell - 1, cell - stride, cell - stride - 1):
+        if corner < 0:
+            continue
+        square = (1 << corner) | (1 << (corner + 1)) \
+            | (1 << (corner + stride)) | (1 << (corner + stride + 1))
+        if blocked & square == square and boxes & square & ~board.targets:
+            return True
+    return False
+
+
+def is_freeze_deadlock(board, boxes, cell):
+    '''
+    This function checks whether the pushed box is frozen, that is it can
+    move neither horizontally nor vertically any more, possibly because
+    its neighbouring boxes are frozen as well. Frozen boxes off target
+    make the state unsolvable.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        boxes: *int*
+            box bit mask.
+        cell: *int*
+            flat index of the pushed box.
+
+    **Returns**
+
+        result: *boolean*
+            yes or no.
+    '''
+    frozen_list = []
+    if is_frozen(board, boxes, cell, set(), frozen_list) is False:
+        return False
+    return any((board.targets >> frozen) & 1 == 0 for frozen in frozen_list)
+
+
+def is_frozen(board, boxes, cell, checked_set, frozen_list):
+    '''
+    This function does the recursive part of is_freeze_deadlock.
+    A box already under check is treated as a wall, which stops the
+    recursion from going around in circles: if both boxes can only move
+    once the other one has moved, neither ever will.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        boxes: *int*
+            box bit mask.
+        cell: *int*
+            flat index of the box to check.
+        checked_set: *set*
+            boxes already under check.
+        frozen_list: *list*
+            collects every box found frozen.
+
+    **Returns**
+
+        result: *boolean*
+            yes or no.
+    '''
+    checked_set.add(cell)
+    frozen_count = len(frozen_list)
+    offsets = board.offsets
+    if is_blocked_along(board, boxes, cell, offsets[LEFT], offsets[RIGHT], checked_set, frozen_list) \
+            and is_blocked_along(board, boxes, cell, offsets[UP], offsets[DOWN], checked_set, frozen_list):
+        frozen_list.append(cell)
+        return True
+
+    # the box can move, so nothing found frozen on its account holds
+    checked_set.discard(cell)
+    del frozen_list[frozen_count:]
+    return False
+
+
+def is_blocked_along(board, boxes, cell, offset_a, offset_b, checked_set, frozen_list):
+    '''
+    This function checks whether a box can not be pushed along one axis.
+    That is the case next to a wall, between two dead squares, or next to
+    a box that is frozen itself.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        boxes: *int*
+            box bit mask.
+        cell: *int*
+            flat index of the box.
+        offset_a: *int*
+            offset to one neighbour on the axis.
+        offset_b: *int*
+            offset to the other neighbour on the axis.
+        checked_set: *set*
+            boxes already under check.
+        frozen_list: *list*
+            collects every box found frozen.
+
+    **Returns**
+
+        result: *boolean*
+            yes or no.
+    '''
+    side_a = cell + offset_a
+    side_b = cell + offset_b
+    if not board.is_floor(side_a) or not board.is_floor(side_b):
+        return True
+    if (board.dead_squares >> side_a) & 1 and (board.dead_squares >> side_b) & 1:
+        return True
+    for side in (side_a, side_b):
+        if (boxes >> side) & 1:
+            if side in checked_set or is_frozen(board, boxes, side, checked_set, frozen_list):
+                return True
+    return False
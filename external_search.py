@@ -0,0 +1,317 @@
+'''
+External memory search for levels whose closed set does not fit in RAM.
+
+external_search is a breadth first search over push moves that keeps
+almost nothing in memory. Each layer of the search lives in a file of
+fixed size records, and the keys of every state seen so far live in
+sorted run files on disk, read through mmap.
+
+Children are collected in a buffer of limited size. When it is full it is
+sorted by key, its own duplicates are dropped, and what is left is merged
+against every run in one forward pass each, jumping ahead by bisection;
+the states that survive are new, go to the next layer file and become a
+new run. Runs are merged together once there are too many of them. The
+solution is traced back by reading the layer files from the last to the
+first.
+'''
+import bisect
+import contextlib
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+
+from compact_board import generate_push_list
+from deadlock import is_deadlock
+from target_matching import Target_Matching
+from search_stats import Search_Stats
+
+
+DEFAULT_BUFFER_SIZE = 1 << 18
+MAX_RUN_COUNT = 16
+
+
+class Spilled_Key_Set():
+    '''
+    The closed set as sorted runs of 64 bit keys in files on disk.
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.run_list = []
+        self.run_count = 0
+        self.key_count = 0
+
+    def write_run(self, key_list):
+        path = os.path.join(self.directory, "run_%d" % self.run_count)
+        self.run_count += 1
+        with open(path, "wb") as run_file:
+            array('Q', key_list).tofile(run_file)
+        return path
+
+    def add_new(self, sorted_key_list):
+        '''
+        This function drops the keys already in the set and stores the
+        others as a new run.
+
+        **Parameters**
+
+            sorted_key_list: *list*
+                keys sorted without duplicates.
+
+        **Returns**
+
+            new_key_set: *set*
+                the keys that were not in the set.
+        '''
+        new_key_list = sorted_key_list
+        for path in self.run_list:
+            with mapped_run(path) as keys:
+                kept_list = []
+                position = 0
+                run_length = len(keys)
+                for key in new_key_list:
+                    # the keys come sorted, so the search goes on from the last position
+                    position = bisect.bisect_left(keys, key, position)
+                    if position == run_length or keys[position] != key:
+                        kept_list.append(key)
+            new_key_list = kept_list
+
+        if len(new_key_list) > 0:
+            self.key_count += len(new_key_list)
+            self.run_list.append(self.write_run(new_key_list))
+        if len(self.run_list) > MAX_RUN_COUNT:
+            self.compact()
+        return set(new_key_list)
+
+    def compact(self):
+        '''
+        This function merges every run into a single one.
+
+        **Returns**
+
+            None.
+        '''
+        path = os.path.join(self.directory, "run_%d" % self.run_count)
+        self.run_count += 1
+        with contextlib.ExitStack() as stack, open(path, "wb") as run_file:
+            key_view_list = [stack.enter_context(mapped_run(old_path)) for old_path in self.run_list]
+            chunk = array('Q')
+            for key in heapq.merge(*key_view_list):
+                chunk.append(key)
+                if len(chunk) >= DEFAULT_BUFFER_SIZE:
+                    chunk.tofile(run_file)
+                    chunk = array('Q')
+            chunk.tofile(run_file)
+        for old_path in self.run_list:
+            os.remove(old_path)
+        self.run_list = [path]
+
+
+@contextlib.contextmanager
+def mapped_run(path):
+    '''
+    This function maps a run file into memory for the time of a with block.
+
+    **Parameters**
+
+        path: *str*
+            run file.
+
+    **Returns**
+
+        keys: *memoryview*
+            the sorted keys of the run.
+    '''
+    with open(path, "rb") as run_file:
+        mapping = mmap.mmap(run_file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    keys = view.cast('Q')
+    try:
+        yield keys
+    finally:
+        keys.release()
+        view.release()
+        mapping.close()
+
+
+def external_search(board, state, heuristic=None, macro_moves=False, stats=None,
+                    buffer_size=DEFAULT_BUFFER_SIZE, spill_directory=None):
+    '''
+    This function runs a breadth first search with its layers and its
+    closed set on disk. Every layer is one push deeper, so the first
+    solved state found has the fewest pushes possible.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state, it is modified during the search.
+        heuristic: *function, optional*
+            unused, accepted so every engine shares one signature.
+        macro_moves: *boolean*
+            must be False, every layer is exactly one push deeper.
+        stats: *Search_Stats, optional*
+            counts the expanded states, see search_stats.py.
+        buffer_size: *int*
+            children kept in memory before they are merged against disk.
+        spill_directory: *str, optional*
+            where the files go, the system temporary directory by default.
+            They are removed when the search ends.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes of the solution, None if there is none.
+    '''
+    if macro_moves is True:
+        raise ValueError("external search does not take macro moves")
+    if stats is None:
+        stats = Search_Stats()
+    if state.is_solved() is True:
+        return []
+    if Target_Matching(board, state.boxes).feasible is False:
+        return None
+
+    # key, parent key, pushed cell, direction, player, boxes
+    box_bytes = (board.size + 7) // 8
+    record = struct.Struct("<QQIBI%ds" % box_bytes)
+    directory = tempfile.mkdtemp(prefix="push_box_", dir=spill_directory)
+    try:
+        closed_set = Spilled_Key_Set(directory)
+        start_key = state.state_key(state.reachable_region())
+        closed_set.add_new([start_key])
+        layer_path_list = [os.path.join(directory, "layer_0")]
+        with open(layer_path_list[0], "wb") as layer_file:
+            layer_file.write(record.pack(start_key, start_key, 0, 0, state.player,
+                                         state.boxes.to_bytes(box_bytes, "little")))
+
+        while True:
+            layer_path = os.path.join(directory, "layer_%d" % len(layer_path_list))
+            buffer_list = []
+            written = 0
+            with open(layer_path, "wb") as next_layer_file:
+                for key, _, _, _, player, boxes in read_layer(layer_path_list[-1], record):
+                    stats.count_node(len(layer_path_list) - 1, closed_set.key_count)
+                    state.restore(int.from_bytes(boxes, "little"), player)
+                    matching = Target_Matching(board, state.boxes)
+                    region = state.reachable_region()
+                    for cell, direction in generate_push_list(state, region):
+                        state.update(cell, direction)
+                        if state.is_solved() is True:
+                            push_list = trace_layers(layer_path_list, record, key)
+                            push_list.append((cell, direction))
+                            return push_list
+                        destination = cell + board.offsets[direction]
+                        if is_deadlock(board, state.boxes, destination) is False:
+                            if matching.update(cell, destination) is True:
+                                child_key = state.state_key(state.reachable_region(
+                                    region, ((cell, direction),)))
+                                buffer_list.append((child_key, record.pack(
+                                    child_key, key, cell, direction, state.player,
+                                    state.boxes.to_bytes(box_bytes, "little"))))
+                            else:
+                                stats.deadlocks += 1
+                            matching.retrospect()
+                        else:
+                            stats.deadlocks += 1
+                        state.retrospect(cell, direction)
+
+                    if len(buffer_list) >= buffer_size:
+                        written += flush_buffer(buffer_list, closed_set, next_layer_file, stats)
+                        buffer_list = []
+                written += flush_buffer(buffer_list, closed_set, next_layer_file, stats)
+
+            layer_path_list.append(layer_path)
+            if written == 0:
+                return None
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def flush_buffer(buffer_list, closed_set, layer_file, stats):
+    '''
+    This function writes the children of the buffer that were never seen
+    to the next layer file.
+
+    **Parameters**
+
+        buffer_list: *list*
+            (key, packed record) of the children.
+        closed_set: *Spilled_Key_Set*
+            keys of every state seen so far.
+        layer_file: *file*
+            the next layer file.
+        stats: *Search_Stats*
+            counts the children dropped as already seen.
+
+    **Returns**
+
+        written: *int*
+            number of records written.
+    '''
+    record_dict = {}
+    for key, packed in buffer_list:
+        record_dict.setdefault(key, packed)
+    new_key_set = closed_set.add_new(sorted(record_dict))
+    for key in sorted(new_key_set):
+        layer_file.write(record_dict[key])
+    stats.duplicates += len(buffer_list) - len(new_key_set)
+    return len(new_key_set)
+
+
+def read_layer(path, record):
+    '''
+    This function reads the records of a layer file one by one.
+
+    **Parameters**
+
+        path: *str*
+            layer file.
+        record: *Struct*
+            record layout.
+
+    **Returns**
+
+        records: *generator*
+            unpacked records.
+    '''
+    with open(path, "rb") as layer_file:
+        while True:
+            chunk = layer_file.read(record.size * 4096)
+            if len(chunk) == 0:
+                return
+            yield from record.iter_unpack(chunk)
+
+
+def trace_layers(layer_path_list, record, key):
+    '''
+    This function walks the parent keys back through the layer files.
+
+    **Parameters**
+
+        layer_path_list: *list*
+            layer files, the last one holding the state of key.
+        record: *Struct*
+            record layout.
+        key: *int*
+            key of the last state.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes from the start to the state.
+    '''
+    push_list = []
+    for path in reversed(layer_path_list[1:]):
+        for state_key, parent_key, cell, direction, _, _ in read_layer(path, record):
+            if state_key == key:
+                push_list.append((cell, direction))
+                key = parent_key
+                break
+    push_list.reverse()
+    return push_list
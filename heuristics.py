@@ -0,0 +1,94 @@
+'''
+Admissible lower bounds on the number of pushes left, for the informed
+search engines. A heuristic is built once per level from the Compact_Board
+and returns an estimate function that takes the box bit mask.
+'''
+from compact_board import iterate_cells
+from assignment_bound import Assignment_Bound, build_cost_rows
+
+
+def zero_heuristic(board):
+    '''
+    This heuristic knows nothing, which turns A* into a breadth first search.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+
+    **Returns**
+
+        estimate: *function*
+            box mask -> lower bound.
+    '''
+    def estimate(boxes):
+        return 0
+    return estimate
+
+
+def manhattan_heuristic(board):
+    '''
+    This heuristic sums, over the boxes, the Manhattan distance to the
+    nearest target. Every push moves one box by one block, so it never
+    overestimates. With spare boxes only the boxes nearest to the targets
+    are summed, one per target, as the others need not move at all.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+
+    **Returns**
+
+        estimate: *function*
+            box mask -> lower bound.
+    '''
+    target_points = [board.point(cell) for cell in iterate_cells(board.targets)]
+    distance = [0] * board.size
+    for cell in iterate_cells(board.floor):
+        x, y = board.point(cell)
+        distance[cell] = min(abs(x - tx) + abs(y - ty) for tx, ty in target_points)
+
+    if board.spare_boxes > 0:
+        target_count = len(target_points)
+
+        def estimate(boxes):
+            return sum(sorted(distance[cell] for cell in iterate_cells(boxes))[:target_count])
+        return estimate
+
+    def estimate(boxes):
+        return sum(distance[cell] for cell in iterate_cells(boxes))
+    return estimate
+
+
+def assignment_heuristic(board):
+    '''
+    This heuristic is the cheapest assignment of the boxes to distinct
+    targets, costed by push distance. It is the strongest of the three.
+    The assignment follows the search incrementally, see assignment_bound.py.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+
+    **Returns**
+
+        estimate: *function*
+            box mask -> lower bound.
+    '''
+    cost_rows = build_cost_rows(board)
+    assignment_list = []
+
+    def estimate(boxes):
+        if len(assignment_list) == 0:
+            assignment_list.append(Assignment_Bound(board, boxes, cost_rows))
+        return assignment_list[0].follow(boxes)
+    return estimate
+
+
+HEURISTICS = {
+    "zero": zero_heuristic,
+    "manhattan": manhattan_heuristic,
+    "assignment": assignment_heuristic,
+}
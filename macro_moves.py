@@ -0,0 +1,279 @@
+'''
+Macro moves for the push box solver.
+
+A search move is a tuple of unit pushes. Most moves hold a single push,
+but two kinds of push are stretched into a longer macro so that the search
+takes them as one step, with one stored state:
+
+    tunnel:    a box pushed into a one block wide corridor, with the player
+               following it in, is pushed on until it leaves the corridor.
+    goal room: when all targets lie in a room behind a single entrance,
+               a box pushed onto the entrance is taken straight to the next
+               free target of the room, the farthest ones first.
+
+Callers still receive unit pushes: the solution is the concatenation of
+the pushes of its moves.
+'''
+from collections import deque
+
+from box_common import LEFT, RIGHT, UP, DOWN
+from compact_board import iterate_cells, generate_push_list
+from reachability import reachable_mask
+
+
+def generate_move_list(state, region, macros=None):
+    '''
+    This function turns every valid push of a state into a search move.
+
+    **Parameters**
+
+        state: *Compact_State*
+            Current state.
+        region: *int*
+            player reachable region as a bit mask.
+        macros: *Macro_Table, optional*
+            macro analysis of the level, None for single pushes only.
+
+    **Returns**
+
+        move_list: *list*
+            one tuple of (cell, direction) pushes per valid push.
+    '''
+    push_list = generate_push_list(state, region)
+    if macros is None:
+        return [(push,) for push in push_list]
+    return [macros.expand(state, cell, direction) for cell, direction in push_list]
+
+
+def move_ends(board, move):
+    '''
+    This function gives the block the moved box started on and the block
+    it ends on. A move only ever pushes one box.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        move: *tuple*
+            (cell, direction) pushes of the move.
+
+    **Returns**
+
+        multiple_result: *tuple*
+            flat index of the source and of the destination.
+    '''
+    cell, direction = move[-1]
+    return move[0][0], cell + board.offsets[direction]
+
+
+class Macro_Table():
+    '''
+    The corridor and goal room analysis of a level, done once at load time.
+    '''
+
+    def __init__(self, board):
+        self.board = board
+        self.tunnels = find_tunnels(board)
+        self.entrance, self.goal_room = find_goal_room(board)
+        self.parking_list = []
+        # a room with a target no box can be pushed to from the entrance is not parked
+        if self.entrance is not None and any(board.push_distances[target][self.entrance] is None
+                                             for target in iterate_cells(board.targets)):
+            self.entrance, self.goal_room = None, 0
+        if self.entrance is not None:
+            # the farthest targets from the entrance are filled first
+            self.parking_list = sorted(
+                iterate_cells(board.targets),
+                key=lambda target: -board.push_distances[target][self.entrance])
+
+    def expand(self, state, cell, direction):
+        '''
+        This function stretches a push into a macro where a rule applies.
+
+        **Parameters**
+
+            state: *Compact_State*
+                Current state, back as it was on return.
+            cell: *int*
+                flat index of the pushed box.
+            direction: *int*
+                pushing direction.
+
+        **Returns**
+
+            move: *tuple*
+                the (cell, direction) pushes of the move.
+        '''
+        board = self.board
+        move = [(cell, direction)]
+        offset = board.offsets[direction]
+        destination = cell + offset
+
+        # tunnel, keep pushing while the box and the player are in the corridor
+        blocked = ~board.floor | board.dead_squares | state.boxes
+        while (self.tunnels[direction] >> destination) & 1 and not (blocked >> (destination + offset)) & 1:
+            move.append((destination, direction))
+            destination += offset
+
+        if destination == self.entrance:
+            move.extend(self.park(state, move, destination))
+        return tuple(move)
+
+    def park(self, state, move, entrance):
+        '''
+        This function finds the pushes taking a box from the entrance of
+        the goal room to the next free target, if it is safe to do so.
+
+        **Parameters**
+
+            state: *Compact_State*
+                Current state, back as it was on return.
+            move: *list*
+                the pushes bringing the box onto the entrance.
+            entrance: *int*
+                flat index of the entrance.
+
+        **Returns**
+
+            push_list: *list*
+                the extra (cell, direction) pushes, empty when the box
+                should not be parked.
+        '''
+        board = self.board
+        for push in move:
+            state.update(*push)
+        push_list = []
+        try:
+            # boxes off target inside the room mean the room is not being filled in order
+            if state.boxes & self.goal_room & ~board.targets:
+                return push_list
+            for target in self.parking_list:
+                if not (state.boxes >> target) & 1:
+                    break
+            else:
+                return push_list
+
+            push_list = find_box_path(state, entrance, target, self.goal_room)
+            if push_list is None:
+                return []
+
+            # the other free targets must stay reachable from the entrance
+            boxes_after = state.boxes ^ (1 << entrance) ^ (1 << target)
+            free_room = (self.goal_room | (1 << entrance)) & ~boxes_after
+            open_targets = board.targets & self.goal_room & ~boxes_after
+            if reachable_mask(entrance, free_room, board.stride) & open_targets != open_targets:
+                return []
+            return push_list
+        finally:
+            for push in reversed(move):
+                state.retrospect(*push)
+
+
+def find_tunnels(board):
+    '''
+    This function finds, for every push direction, the blocks where a box
+    pushed in is inside a one block wide corridor and so is the player
+    behind it. Targets are left out, a box may have to stop there.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+
+    **Returns**
+
+        tunnels: *dict*
+            direction -> bit mask of tunnel blocks.
+    '''
+    tunnels = {}
+    for direction in (LEFT, RIGHT, UP, DOWN):
+        offset = board.offsets[direction]
+        if direction in (LEFT, RIGHT):
+            side_a, side_b = board.offsets[UP], board.offsets[DOWN]
+        else:
+            side_a, side_b = board.offsets[LEFT], board.offsets[RIGHT]
+        mask = 0
+        for cell in iterate_cells(board.floor & ~board.targets):
+            behind = cell - offset
+            if all(board.is_floor(wall_cell) is False
+                   for wall_cell in (cell + side_a, cell + side_b, behind + side_a, behind + side_b)):
+                mask |= 1 << cell
+        tunnels[direction] = mask
+    return tunnels
+
+
+def find_goal_room(board):
+    '''
+    This function looks for the smallest room holding every target that is
+    cut from the rest of the level by a single entrance block.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+
+    **Returns**
+
+        multiple_result: *tuple*
+            flat index of the entrance and bit mask of the room,
+            (None, 0) when there is no such room.
+    '''
+    if board.targets == 0:
+        return None, 0
+    first_target = (board.targets & -board.targets).bit_length() - 1
+    best_entrance, best_room = None, 0
+    for entrance in iterate_cells(board.floor & ~board.targets):
+        rest = board.floor & ~(1 << entrance)
+        room = reachable_mask(first_target, rest, board.stride)
+        if room & board.targets != board.targets or room == rest:
+            continue
+        if best_entrance is None or bin(room).count("1") < bin(best_room).count("1"):
+            best_entrance, best_room = entrance, room
+    return best_entrance, best_room
+
+
+def find_box_path(state, box, target, area):
+    '''
+    This function finds the fewest pushes taking one box to a target while
+    every other box stays put, the box staying inside the given area.
+
+    **Parameters**
+
+        state: *Compact_State*
+            Current state, the box already on its starting block.
+        box: *int*
+            flat index of the box.
+        target: *int*
+            flat index of the target.
+        area: *int*
+            bit mask of the blocks the box may be pushed onto.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes, None if there is no way.
+    '''
+    board = state.board
+    free = board.floor & ~(state.boxes & ~(1 << box))
+    region = reachable_mask(state.player, free & ~(1 << box), board.stride)
+    start_key = (box, (region & -region).bit_length() - 1)
+    parent_dict = {start_key: None}
+    queue = deque([(box, region, start_key)])
+
+    while len(queue) > 0:
+        box, region, key = queue.popleft()
+        if box == target:
+            push_list = []
+            while parent_dict[key] is not None:
+                key, push = parent_dict[key]
+                push_list.append(push)
+            push_list.reverse()
+            return push_list
+        for direction, behind, destination in board.push_table[box]:
+            if (region >> behind) & 1 and (free >> destination) & 1 and (area >> destination) & 1:
+                next_region = reachable_mask(box, free & ~(1 << destination), board.stride)
+                next_key = (destination, (next_region & -next_region).bit_length() - 1)
+                if next_key not in parent_dict:
+                    parent_dict[next_key] = (key, (box, direction))
+                    queue.append((destination, next_region, next_key))
+    return None
@@ -0,0 +1,116 @@
+'''
+Move ordering for the depth first search.
+
+The backtracker always tries the last move of a list first, so the moves
+of a state are sorted from the least to the most promising before they go
+on the stack. A move ordering is a sequence of criterion names; moves are
+compared on the first criterion, ties on the second, and so on:
+
+    "target":     moves onto a target first, moves off a target last.
+    "distance":   moves that bring the box closest to a free target.
+    "assignment": moves that lower the box to target assignment bound most.
+    "inertia":    moves of the box that was moved last.
+
+An empty ordering keeps the generation order.
+'''
+from compact_board import iterate_cells
+from assignment_bound import Assignment_Bound
+from macro_moves import move_ends
+
+
+ORDERING_CRITERIA = ("target", "distance", "assignment", "inertia")
+DEFAULT_MOVE_ORDERING = ("assignment", "inertia")
+
+
+class Move_Ordering():
+    '''
+    Sorts the moves of a state by the configured criteria.
+    '''
+
+    def __init__(self, board, criteria=DEFAULT_MOVE_ORDERING):
+        for criterion in criteria:
+            if criterion not in ORDERING_CRITERIA:
+                raise ValueError("unknown move ordering criterion %r" % (criterion,))
+        self.board = board
+        self.criteria = tuple(criteria)
+        self.assignment = None
+
+    def order(self, state, move_list, last_move=None):
+        '''
+        This function sorts the moves in place, the most promising last.
+
+        **Parameters**
+
+            state: *Compact_State*
+                Current state.
+            move_list: *list*
+                moves of the state, tuples of (cell, direction) pushes.
+            last_move: *tuple, optional*
+                the move that led to the state.
+
+        **Returns**
+
+            move_list: *list*
+                the same list, sorted.
+        '''
+        if len(self.criteria) == 0 or len(move_list) < 2:
+            return move_list
+
+        board = self.board
+        if "assignment" in self.criteria:
+            if self.assignment is None:
+                self.assignment = Assignment_Bound(board, state.boxes)
+            current_bound = self.assignment.follow(state.boxes)
+        if "distance" in self.criteria:
+            free_targets = board.targets & ~state.boxes
+        last_destination = None
+        if last_move is not None:
+            last_destination = move_ends(board, last_move)[1]
+
+        score_dict = {}
+        for move in move_list:
+            cell, destination = move_ends(board, move)
+            score = []
+            for criterion in self.criteria:
+                if criterion == "target":
+                    score.append(((board.targets >> destination) & 1) - ((board.targets >> cell) & 1))
+                elif criterion == "distance":
+                    targets = free_targets | (board.targets & (1 << cell))
+                    score.append(nearest_target_distance(board, targets, cell)
+                                 - nearest_target_distance(board, targets, destination))
+                elif criterion == "assignment":
+                    score.append(current_bound - self.assignment.update(cell, destination))
+                    self.assignment.retrospect()
+                else:
+                    score.append(1 if cell == last_destination else 0)
+            score_dict[move] = tuple(score)
+
+        move_list.sort(key=score_dict.__getitem__)
+        return move_list
+
+
+def nearest_target_distance(board, targets, cell):
+    '''
+    This function gives the push distance from a block to the nearest of
+    the given targets, the size of the board when none can be reached.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        targets: *int*
+            bit mask of the targets to consider.
+        cell: *int*
+            flat index of the box.
+
+    **Returns**
+
+        distance: *int*
+            pushes to the nearest target.
+    '''
+    nearest = board.size
+    for target in iterate_cells(targets):
+        distance = board.push_distances[target][cell]
+        if distance is not None and distance < nearest:
+            nearest = distance
+    return nearest
@@ -0,0 +1,316 @@
+'''
+Hash distributed A* (HDA*) for the push box solver.
+
+One level is searched by several worker processes at once. Every state
+belongs to the worker picked by the hash of its state key, and only that
+worker keeps its cost, its parent and its place in an open list. A worker
+expands its own best states and sends each child to the child's owner,
+grouped in batches so a queue is not touched once per state. A batch
+leaves when it is full, and a partial one after a few expansions, so a
+good state never waits on a busy worker while its owner runs out of work.
+
+The first solution found is only an upper bound: workers go on until no
+open state anywhere could beat it and no batch is still on its way, which
+keeps the result push optimal like astar_search. The main process watches
+for that moment through the idle flags of the workers and the number of
+states sent and received, then walks the parent links back worker by
+worker to build the push list.
+
+The queues between the workers are not free, so HDA* only gets ahead of
+astar_search when every worker has a core of its own; with fewer cores
+than workers it is slower.
+'''
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+
+from compact_board import Compact_State, generate_push_list
+from deadlock import is_deadlock
+from target_matching import Target_Matching
+from search_stats import Search_Stats
+
+
+BATCH_SIZE = 64
+# expansions between two sends of the partial batches
+FLUSH_INTERVAL = 8
+POLL_INTERVAL = 0.005
+NO_SOLUTION = 2 ** 62
+
+
+def owner_of(state_key, processes):
+    return hash(state_key) % processes
+
+
+def hda_star_search(board, state, heuristic, macro_moves=False, stats=None, processes=None):
+    '''
+    This function runs A* over push moves on several worker processes.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state.
+        heuristic: *function*
+            builds the estimate function from the board, see heuristics.py.
+            It is sent to the workers, so it must be a module level function.
+        macro_moves: *boolean*
+            must be False, the workers push one box one block at a time.
+        stats: *Search_Stats, optional*
+            counts the expanded states of all workers, see search_stats.py.
+        processes: *int, optional*
+            number of workers, the CPU count by default.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes of the solution, None if there is none.
+    '''
+    if macro_moves is True:
+        raise ValueError("hash distributed A* does not take macro moves")
+    if stats is None:
+        stats = Search_Stats()
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if state.is_solved() is True:
+        return []
+    if Target_Matching(board, state.boxes).feasible is False:
+        return None
+
+    inbox_list = [multiprocessing.Queue() for _ in range(processes)]
+    reply_queue = multiprocessing.Queue()
+    # message_count is [states sent, states received], incumbent is [cost, owner rank]
+    message_count = multiprocessing.Array('q', 2)
+    incumbent = multiprocessing.Array('q', [NO_SOLUTION, -1])
+    idle = multiprocessing.Array('b', processes, lock=False)
+    node_count = multiprocessing.Array('q', processes, lock=False)
+    stop = multiprocessing.Event()
+
+    process_list = []
+    for rank in range(processes):
+        process = multiprocessing.Process(
+            target=hda_star_worker,
+            args=(rank, board, heuristic, inbox_list, reply_queue, message_count,
+                  incumbent, idle, node_count, stop))
+        process.start()
+        process_list.append(process)
+
+    try:
+        start_key = state.state_key(state.reachable_region())
+        with message_count.get_lock():
+            message_count[0] += 1
+        inbox_list[owner_of(start_key, processes)].put(
+            ("states", [(0, 0, state.boxes, state.player, state.zobrist, start_key, None, None)]))
+
+        wait_for_termination(process_list, message_count, idle, node_count, stats)
+        stop.set()
+
+        cost, rank = incumbent[:]
+        if cost == NO_SOLUTION:
+            return None
+        inbox_list[rank].put(("goal",))
+        state_key = reply_queue.get()
+        push_list = []
+        while True:
+            inbox_list[owner_of(state_key, processes)].put(("parent", state_key))
+            state_key, push = reply_queue.get()
+            if state_key is None:
+                break
+            push_list.append(push)
+        push_list.reverse()
+        return push_list
+    finally:
+        stop.set()
+        for inbox in inbox_list:
+            inbox.put(("quit",))
+        for process in process_list:
+            process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        stats.nodes += sum(node_count)
+
+
+def wait_for_termination(process_list, message_count, idle, node_count, stats):
+    '''
+    This function waits until every worker is idle and no batch of states
+    is on its way. The counters are read before and after the idle flags;
+    when they did not move and every sent state was received, no worker
+    could have been woken up in between.
+
+    **Parameters**
+
+        process_list: *list*
+            the worker processes.
+        message_count: *Array*
+            states sent and states received.
+        idle: *Array*
+            one idle flag per worker.
+        node_count: *Array*
+            expanded states per worker.
+        stats: *Search_Stats*
+            holds the budgets; the workers count nodes, not visited states.
+
+    **Returns**
+
+        None.
+    '''
+    while True:
+        time.sleep(POLL_INTERVAL)
+        if any(process.is_alive() is False for process in process_list):
+            raise RuntimeError("a search worker exited early")
+        if stats.max_nodes is not None and stats.nodes + sum(node_count) > stats.max_nodes:
+            stats.stop("node_limit", "node budget of %d spent" % stats.max_nodes)
+        stats.check_clock()
+
+        with message_count.get_lock():
+            before = message_count[:]
+        all_idle = all(flag == 1 for flag in idle)
+        with message_count.get_lock():
+            after = message_count[:]
+        if all_idle is True and before == after and after[0] == after[1]:
+            return
+
+
+def hda_star_worker(rank, board, heuristic, inbox_list, reply_queue, message_count,
+                    incumbent, idle, node_count, stop):
+    '''
+    This function is one worker of hda_star_search. It owns the states
+    hashed to its rank and serves parent lookups once the search stops.
+
+    **Parameters**
+
+        rank: *int*
+            index of the worker.
+        board: *Compact_Board*
+            the level.
+        heuristic: *function*
+            builds the estimate function from the board.
+        inbox_list: *list*
+            the inbox queue of every worker.
+        reply_queue: *Queue*
+            answers to the main process.
+        message_count: *Array*
+            states sent and states received.
+        incumbent: *Array*
+            cost of the best solution so far and the rank owning it.
+        idle: *Array*
+            one idle flag per worker.
+        node_count: *Array*
+            expanded states per worker.
+        stop: *Event*
+            set once the search is over.
+
+    **Returns**
+
+        None.
+    '''
+    processes = len(inbox_list)
+    inbox = inbox_list[rank]
+    parent = multiprocessing.parent_process()
+    estimate = heuristic(board)
+    state = Compact_State(board, 0, 0)
+    counter = itertools.count()
+    open_heap = []
+    cost_dict = {}
+    parent_dict = {}
+    goal_key = None
+    outbox_list = [[] for _ in range(processes)]
+
+    def receive(f, g, boxes, player, zobrist, state_key, parent_key, push):
+        if g < cost_dict.get(state_key, g + 1):
+            cost_dict[state_key] = g
+            parent_dict[state_key] = (parent_key, push)
+            # among equal f the deepest state comes first, as in astar_search
+            heapq.heappush(open_heap, (f, -g, next(counter), boxes, player, zobrist, state_key))
+
+    def flush(owner):
+        batch = outbox_list[owner]
+        outbox_list[owner] = []
+        with message_count.get_lock():
+            message_count[0] += len(batch)
+        inbox_list[owner].put(("states", batch))
+
+    def flush_all():
+        for owner in range(processes):
+            if len(outbox_list[owner]) > 0:
+                flush(owner)
+
+    while True:
+        # step 1, take in what has arrived, waiting only when there is nothing to expand
+        has_work = len(open_heap) > 0 and open_heap[0][0] < incumbent[0] and not stop.is_set()
+        try:
+            message = inbox.get_nowait() if has_work else inbox.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            message = None
+        if message is not None:
+            if message[0] == "states":
+                # marked busy before the states count as received
+                idle[rank] = 0
+                with message_count.get_lock():
+                    message_count[1] += len(message[1])
+                for entry in message[1]:
+                    receive(*entry)
+            elif message[0] == "goal":
+                reply_queue.put(goal_key)
+            elif message[0] == "parent":
+                reply_queue.put(parent_dict[message[1]])
+            else:
+                for other_inbox in inbox_list:
+                    other_inbox.cancel_join_thread()
+                return
+            continue
+
+        if has_work is False:
+            flush_all()
+            idle[rank] = 1
+            # nobody is left to stop this worker if the search process was killed
+            if parent.is_alive() is False:
+                return
+            continue
+
+        # step 2, expand the best open state, a solved one only lowers the incumbent
+        f, negative_g, _, boxes, player, zobrist, state_key = heapq.heappop(open_heap)
+        g = -negative_g
+        if g > cost_dict[state_key]:
+            continue
+        state.restore(boxes, player, zobrist)
+        if state.is_solved() is True:
+            with incumbent.get_lock():
+                if g < incumbent[0]:
+                    incumbent[0] = g
+                    incumbent[1] = rank
+                    goal_key = state_key
+            continue
+        node_count[rank] += 1
+        if node_count[rank] % 1024 == 0 and parent.is_alive() is False:
+            return
+
+        # step 3, send every child to its owner, as astar_search does on one process
+        matching = Target_Matching(board, state.boxes)
+        estimate(state.boxes)
+        region = state.reachable_region()
+        for cell, direction in generate_push_list(state, region):
+            state.update(cell, direction)
+            destination = cell + board.offsets[direction]
+            if is_deadlock(board, state.boxes, destination) is False:
+                if matching.update(cell, destination) is True:
+                    child_key = state.state_key(state.reachable_region(region, ((cell, direction),)))
+                    entry = (g + 1 + estimate(state.boxes), g + 1, state.boxes, state.player,
+                             state.zobrist, child_key, state_key, (cell, direction))
+                    owner = owner_of(child_key, processes)
+                    if owner == rank:
+                        receive(*entry)
+                    else:
+                        outbox_list[owner].append(entry)
+                        if len(outbox_list[owner]) >= BATCH_SIZE:
+                            flush(owner)
+                matching.retrospect()
+            state.retrospect(cell, direction)
+
+        # step 4, send the partial batches too, now and then
+        if node_count[rank] % FLUSH_INTERVAL == 0:
+            flush_all()
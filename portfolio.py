@@ -0,0 +1,189 @@
+'''
+Portfolio runner for the push box solver.
+
+No single search engine wins on every level, so a portfolio races several
+generate_solution configurations on the same level, one process each. The
+first configuration to come back with a valid solution, or to prove the
+level unsolvable, wins and the others are stopped. The name of the winner
+is returned with the solution so the mix can be tuned per level family.
+'''
+import contextlib
+import io
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+
+from box_common import GAME_FAILED, GAME_UNFINISHED
+from box_3 import Push_Move, generate_solution
+from compact_board import Compact_Board, Compact_State
+from search_stats import Search_Stats
+
+# seconds between two looks at the cancellation token
+POLL_INTERVAL = 0.1
+
+# name -> generate_solution keyword arguments
+DEFAULT_PORTFOLIO = {
+    "dfs": {"strategy": "dfs"},
+    "astar": {"strategy": "astar", "heuristic": "assignment"},
+    "bidirectional": {"strategy": "bidirectional"},
+}
+
+
+def run_entrant(board, target_list, player_initial, options, max_nodes, max_visited, connection):
+    '''
+    This function is one racer of the portfolio: it solves the level with
+    one configuration and sends the outcome back through the connection.
+
+    **Parameters**
+
+        board: *list*
+            Initial board map.
+        target_list: *list*
+            contains all the target location for boxes.
+        player_initial: *tuple*
+            player initial location.
+        options: *dict*
+            generate_solution keyword arguments.
+        max_nodes: *int or None*
+            node budget of the search.
+        max_visited: *int or None*
+            visited set budget of the search.
+        connection: *Connection*
+            write end of the pipe to the portfolio.
+
+    **Returns**
+
+        None.
+    '''
+    stats = Search_Stats(max_nodes, max_visited=max_visited)
+    with contextlib.redirect_stdout(io.StringIO()):
+        solution = generate_solution(board, target_list, player_initial, stats=stats, **options)
+    if solution == GAME_FAILED:
+        connection.send(("failed", None, stats.nodes))
+    elif solution == GAME_UNFINISHED:
+        connection.send((stats.stop_reason, None, stats.nodes))
+    else:
+        connection.send(("solved", [(push.box, push.direction) for push in solution], stats.nodes))
+    connection.close()
+
+
+def solve_portfolio(board, target_list, player_initial, portfolio=DEFAULT_PORTFOLIO,
+                    time_limit=None, stats=None):
+    '''
+    This function races the configurations of the portfolio on one level.
+
+    **Parameters**
+
+        board: *list*
+            Initial board map, left untouched.
+        target_list: *list*
+            contains all the target location for boxes.
+        player_initial: *tuple*
+            player initial location.
+        portfolio: *dict*
+            name -> generate_solution keyword arguments.
+        time_limit: *float, optional*
+            wall-clock seconds before every racer is stopped.
+        stats: *Search_Stats, optional*
+            gets the nodes of the winner; its node and visited set budgets
+            apply to every racer on its own, its time budget and its
+            cancellation token to the whole race.
+
+    **Returns**
+
+        multiple_result: *tuple*
+            the Push_Move list, GAME_FAILED or GAME_UNFINISHED when every
+            racer ran out of its budget, and the name of the winner.
+    '''
+    if stats is None:
+        stats = Search_Stats()
+    # connection -> (name, process)
+    running_dict = {}
+    for name, options in portfolio.items():
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=run_entrant,
+            args=(board, target_list, player_initial, options, stats.max_nodes, stats.max_visited, sender))
+        process.start()
+        sender.close()
+        running_dict[receiver] = (name, process)
+
+    try:
+        deadline = stats.deadline
+        if time_limit is not None and (deadline is None or time.monotonic() + time_limit < deadline):
+            deadline = time.monotonic() + time_limit
+        while len(running_dict) > 0:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if stats.cancel is not None:
+                timeout = POLL_INTERVAL if timeout is None else min(timeout, POLL_INTERVAL)
+            ready_list = wait(list(running_dict), timeout)
+            if stats.cancel is not None and stats.cancel.is_set():
+                stats.stop_reason = "cancelled"
+                return GAME_UNFINISHED, None
+            if deadline is not None and time.monotonic() >= deadline and len(ready_list) == 0:
+                stats.stop_reason = "time_limit"
+                return GAME_UNFINISHED, None
+            for receiver in ready_list:
+                name, process = running_dict.pop(receiver)
+                try:
+                    status, push_list, nodes = receiver.recv()
+                except EOFError:
+                    # the racer crashed, the others may still make it
+                    continue
+                finally:
+                    receiver.close()
+                    process.join()
+                if status not in ("solved", "failed"):
+                    stats.stop_reason = status
+                    continue
+                stats.nodes += nodes
+                if status == "failed":
+                    return GAME_FAILED, name
+                solution = [Push_Move(location, direction) for location, direction in push_list]
+                if is_valid_solution(board, target_list, player_initial, solution) is True:
+                    return solution, name
+        if stats.stop_reason is None:
+            raise RuntimeError("no racer of the portfolio came back with a valid answer")
+        return GAME_UNFINISHED, None
+    finally:
+        for receiver, (name, process) in running_dict.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+
+
+def is_valid_solution(board, target_list, player_initial, solution):
+    '''
+    This function replays a solution push by push on the initial board.
+
+    **Parameters**
+
+        board: *list*
+            Initial board map.
+        target_list: *list*
+            contains all the target location for boxes.
+        player_initial: *tuple*
+            player initial location.
+        solution: *list*
+            Push_Move list to check.
+
+    **Returns**
+
+        result: *boolean*
+            whether every push is legal and all boxes end on targets.
+    '''
+    compact_board = Compact_Board(board, target_list)
+    state = Compact_State.from_board_map(compact_board, board, player_initial)
+    for push in solution:
+        cell = compact_board.index(push.box)
+        offset = compact_board.offsets[push.direction]
+        if not (state.boxes >> cell) & 1:
+            return False
+        behind = cell - offset
+        if compact_board.is_floor(behind) is False or not (state.reachable_region() >> behind) & 1:
+            return False
+        destination = cell + offset
+        if compact_board.is_floor(destination) is False or (state.boxes >> destination) & 1:
+            return False
+        state.update(cell, push.direction)
+    return state.is_solved()
@@ -0,0 +1,247 @@
+'''
+Player reachability for the push box solver.
+The player's reachable region is computed once per board status with a
+breadth first flood fill, so every push candidate can then be answered
+by a simple membership test.
+
+After a single push the region of the parent status is repaired instead:
+the block the box left only joins the player to more blocks, and the block
+the box arrived on only cuts the region when it joined two parts of it
+that do not touch around it.
+'''
+from collections import deque, OrderedDict
+
+from box_common import PATH
+
+
+DEFAULT_REGION_CACHE_SIZE = 4096
+
+
+def is_simple_neighbourhood(neighbourhood):
+    '''
+    This function tells whether the free side neighbours of a block stay
+    connected through the eight blocks around it once it is blocked.
+
+    **Parameters**
+
+        neighbourhood: *int*
+            the 3x3 blocks around the blocked one as bits, row by row
+            from the top-left corner, a set bit being free.
+
+    **Returns**
+
+        result: *boolean*
+            True when blocking the centre cannot cut a region in two.
+    '''
+    # side neighbours in turn around the centre, with the corner between each and the next
+    side_list = (1, 5, 7, 3)
+    corner_list = (2, 8, 6, 0)
+    sides = 0
+    links = 0
+    for index in range(4):
+        if (neighbourhood >> side_list[index]) & 1:
+            sides += 1
+            following = side_list[(index + 1) % 4]
+            if (neighbourhood >> following) & 1 and (neighbourhood >> corner_list[index]) & 1:
+                links += 1
+    # the sides make paths around the centre, or one ring when all four are linked
+    return sides - links <= 1
+
+
+SIMPLE_NEIGHBOURHOOD = [is_simple_neighbourhood(neighbourhood) for neighbourhood in range(512)]
+
+
+def player_reachable_region(board_map, player_location):
+    '''
+    This function flood fills the board map from the player location
+    and collects every block the player can walk to without pushing a box.
+
+    **Parameters**
+
+        board_map: *list*
+            Current board map.
+        player_location: *tuple*
+            Current player location.
+
+    **Returns**
+
+        region: *set*
+            all the reachable coordinates, player location included.
+    '''
+    region = {player_location}
+    queue = deque([player_location])
+    height = len(board_map)
+
+    while len(queue) > 0:
+        x, y = queue.popleft()
+        for point in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if point in region:
+                continue
+            px, py = point
+            if 0 <= py < height and 0 <= px < len(board_map[py]) \
+                    and board_map[py][px] == PATH:
+                region.add(point)
+                queue.append(point)
+
+    return region
+
+
+def reachable_mask(player_cell, free_mask, stride):
+    '''
+    This function is the bit mask version of the flood fill, used with the
+    compact board. Every round grows the region by one block in all four
+    directions at once, until it stops changing.
+
+    **Parameters**
+
+        player_cell: *int*
+            flat index of the player.
+        free_mask: *int*
+            bit mask of the blocks the player can walk on.
+        stride: *int*
+            flat index distance between two rows.
+
+    **Returns**
+
+        region: *int*
+            bit mask of the reachable blocks.
+    '''
+    return grow_mask(1 << player_cell, free_mask, stride)
+
+
+def grow_mask(region, free_mask, stride):
+    '''
+    This function grows a connected region over the free blocks until it
+    stops changing, so it costs as many rounds as the blocks it adds are
+    far from it.
+
+    **Parameters**
+
+        region: *int*
+            bit mask of connected free blocks to grow from.
+        free_mask: *int*
+            bit mask of the blocks the player can walk on.
+        stride: *int*
+            flat index distance between two rows.
+
+    **Returns**
+
+        region: *int*
+            bit mask of the blocks connected to the starting ones.
+    '''
+    while True:
+        grown = (region | (region << 1) | (region >> 1)
+                 | (region << stride) | (region >> stride)) & free_mask
+        if grown == region:
+            return region
+        region = grown
+
+
+def repaired_mask(region, cell, destination, free_mask, stride):
+    '''
+    This function gives the region after the box on cell was pushed to
+    destination, from the region before the push. The player now stands on
+    cell, next to the old region, so the region only grows from there,
+    unless destination was a passage between two parts of the old region;
+    only then is the board flooded again.
+
+    **Parameters**
+
+        region: *int*
+            bit mask of the region before the push.
+        cell: *int*
+            flat index the box left.
+        destination: *int*
+            flat index the box arrived on.
+        free_mask: *int*
+            bit mask of the free blocks after the push.
+        stride: *int*
+            flat index distance between two rows.
+
+    **Returns**
+
+        region: *int*
+            bit mask of the region after the push.
+    '''
+    if (region >> destination) & 1:
+        corner = destination - stride - 1
+        if corner < 0:
+            return reachable_mask(cell, free_mask, stride)
+        neighbourhood = ((free_mask >> corner) & 7) | (((free_mask >> (corner + stride)) & 7) << 3) \
+            | (((free_mask >> (corner + 2 * stride)) & 7) << 6)
+        if SIMPLE_NEIGHBOURHOOD[neighbourhood] is False:
+            return reachable_mask(cell, free_mask, stride)
+        region &= ~(1 << destination)
+    return grow_mask(region | (1 << cell), free_mask, stride)
+
+
+class Region_Cache():
+    '''
+    Least recently used cache of the player regions of box layouts.
+    A layout is keyed by the Zobrist key of its boxes and keeps every
+    region that was flooded in it, so a backtracking search coming back to
+    a layout answers reachability with a dictionary lookup.
+    '''
+
+    def __init__(self, capacity=DEFAULT_REGION_CACHE_SIZE):
+        self.capacity = capacity
+        # box Zobrist key -> (box mask, list of region masks)
+        self.entry_dict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, boxes, zobrist, player_cell):
+        '''
+        This function finds the cached region of the player in a layout.
+
+        **Parameters**
+
+            boxes: *int*
+                box bit mask.
+            zobrist: *int*
+                Zobrist key of the boxes.
+            player_cell: *int*
+                player flat index.
+
+        **Returns**
+
+            region: *int*
+                bit mask of the blocks the player can reach, None when
+                it was never stored.
+        '''
+        entry = self.entry_dict.get(zobrist)
+        if entry is not None and entry[0] == boxes:
+            self.entry_dict.move_to_end(zobrist)
+            for region in entry[1]:
+                if (region >> player_cell) & 1:
+                    self.hits += 1
+                    return region
+        self.misses += 1
+        return None
+
+    def store(self, boxes, zobrist, region):
+        '''
+        This function keeps a region of a layout, dropping the least
+        recently used layout when the cache is full.
+
+        **Parameters**
+
+            boxes: *int*
+                box bit mask.
+            zobrist: *int*
+                Zobrist key of the boxes.
+            region: *int*
+                bit mask of the blocks the player can reach.
+
+        **Returns**
+
+            None.
+        '''
+        entry = self.entry_dict.get(zobrist)
+        if entry is None or entry[0] != boxes:
+            entry = (boxes, [])
+            self.entry_dict[zobrist] = entry
+            if len(self.entry_dict) > self.capacity:
+                self.entry_dict.popitem(last=False)
+        self.entry_dict.move_to_end(zobrist)
+        entry[1].append(region)
@@ -0,0 +1,630 @@
+'''
+Search engines over push moves on the compact board.
+
+Every engine takes the Compact_Board and the initial Compact_State,
+counts the states it expands in an optional Search_Stats, and returns the
+solution as a list of (cell, direction) pushes, or None when the level
+cannot be solved. Internally the engines step over moves, tuples of
+pushes, so that the macro moves of macro_moves.py count as one step.
+
+    depth_first_search: the backtracker, with move ordering, finds a
+                        solution fast but not a short one.
+    astar_search:       best first search, push optimal with an
+                        admissible heuristic.
+    ida_star_search:    iterative deepening A*, push optimal and only
+                        keeps the current path in memory.
+    bidirectional_search: breadth first pushes from the start meeting
+                        breadth first pulls from the solved boxes,
+                        push optimal.
+    hda_star_search:    A* spread over several processes by state hash,
+                        push optimal, see parallel_search.py.
+    external_search:    breadth first search with its closed set on disk,
+                        push optimal, see external_search.py.
+'''
+import heapq
+import itertools
+import os
+import time
+
+from compact_board import Compact_State, generate_push_list, generate_pull_list
+from deadlock import is_deadlock
+from target_matching import Target_Matching
+from move_ordering import Move_Ordering, DEFAULT_MOVE_ORDERING
+from macro_moves import Macro_Table, generate_move_list, move_ends
+from heuristics import zero_heuristic
+from search_stats import Search_Stats, Search_Exhausted
+from parallel_search import hda_star_search
+from transposition_table import Transposition_Table, DEFAULT_TRANSPOSITION_MEMORY
+from external_search import external_search
+from checkpoint import level_fingerprint, save_checkpoint, load_checkpoint, DEFAULT_CHECKPOINT_INTERVAL
+
+
+def depth_first_search(board, state, heuristic=None, move_ordering=DEFAULT_MOVE_ORDERING, macro_moves=True,
+                       stats=None, checkpoint=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
+                       resume=False):
+    '''
+    This function is the original backtracker of generate_solution.
+    It always tries the last push of the sorted list first and never
+    stores the same state twice. Its stacks and visited set can be saved
+    to a checkpoint file and the search resumed from it, see checkpoint.py.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state, it is modified during the search.
+        heuristic: *function, optional*
+            unused, accepted so every engine shares one signature.
+        move_ordering: *tuple*
+            criteria to sort the pushes by, see move_ordering.py.
+        macro_moves: *boolean*
+            whether tunnel and goal room pushes are taken as one move.
+        stats: *Search_Stats, optional*
+            counts the expanded states, see search_stats.py.
+        checkpoint: *str, optional*
+            checkpoint file, written every checkpoint_interval seconds
+            and when a budget stops the search.
+        checkpoint_interval: *float*
+            wall-clock seconds between two checkpoints.
+        resume: *boolean*
+            whether to go on from the checkpoint file when there is one.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes of the solution, None if there is none.
+    '''
+    visited_state_set = set()
+    macros = Macro_Table(board) if macro_moves is True else None
+    if stats is None:
+        stats = Search_Stats()
+
+    region = state.reachable_region()
+    visited_state_set.add(state.state_key(region))
+
+    stack_move = []
+    stack_possibility = []
+    if state.is_solved() is True:
+        return stack_move
+    matching = Target_Matching(board, state.boxes)
+    if matching.feasible is False:
+        return None
+    ordering = Move_Ordering(board, move_ordering)
+    stack_region = [region]
+
+    if checkpoint is not None:
+        fingerprint = level_fingerprint(board, state)
+        next_checkpoint = time.monotonic() + checkpoint_interval
+        if resume is True and os.path.exists(checkpoint):
+            stack_move, stack_possibility, visited_state_set = load_checkpoint(checkpoint, fingerprint)
+            # walk the saved path again to rebuild the matching and the regions
+            for move in stack_move:
+                state.apply_move(move)
+                matching.update(*move_ends(board, move))
+                stack_region.append(state.reachable_region(stack_region[-1], move))
+
+    try:
+        # the last state of the path has no possibilities yet, unless resumed after it got them
+        if len(stack_possibility) == len(stack_move):
+            stats.count_node(len(stack_move), len(visited_state_set))
+            last_move = stack_move[-1] if len(stack_move) > 0 else None
+            stack_possibility.append(ordering.order(state, generate_move_list(state, stack_region[-1], macros),
+                                                    last_move))
+        while len(stack_possibility) > 0:
+            # step 0, go back one push once every possibility at this depth is tried
+            if stack_possibility[-1] == []:
+                stack_possibility.pop()
+                stack_region.pop()
+                if len(stack_move) > 0:
+                    state.undo_move(stack_move.pop())
+                    matching.retrospect()
+                continue
+
+            stack_move.append(stack_possibility[-1].pop())
+            state.apply_move(stack_move[-1])
+
+            # step 1, check whether every box is at target location
+            if state.is_solved() is True:
+                return [push for move in stack_move for push in move]
+
+            # step 2, drop the move if it froze a box away from the targets
+            cell, destination = move_ends(board, stack_move[-1])
+            if is_deadlock(board, state.boxes, destination) is True:
+                stats.deadlocks += 1
+                state.undo_move(stack_move.pop())
+                continue
+
+            # step 3, drop the move if the targets can no longer all get their own box
+            if matching.update(cell, destination) is False:
+                stats.deadlocks += 1
+                matching.retrospect()
+                state.undo_move(stack_move.pop())
+                continue
+
+            # step 4, check wheher the current board status has occured
+            region = state.reachable_region(stack_region[-1], stack_move[-1])
+            state_key = state.state_key(region)
+            if state_key in visited_state_set:
+                stats.duplicates += 1
+                matching.retrospect()
+                state.undo_move(stack_move.pop())
+                continue
+            visited_state_set.add(state_key)
+
+            # step 5 find all the possible pushing moves (if there is any), and put in a list.
+            stats.count_node(len(stack_move), len(visited_state_set))
+            stack_possibility.append(ordering.order(state, generate_move_list(state, region, macros),
+                                                    stack_move[-1]))
+            stack_region.append(region)
+
+            # step 6, save the search now and then, it is whole between two moves
+            if checkpoint is not None and time.monotonic() >= next_checkpoint:
+                save_checkpoint(checkpoint, fingerprint, stack_move, stack_possibility, visited_state_set)
+                next_checkpoint = time.monotonic() + checkpoint_interval
+    except Search_Exhausted:
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, fingerprint, stack_move, stack_possibility, visited_state_set)
+        raise
+
+    return None
+
+
+def astar_search(board, state, heuristic, macro_moves=False, stats=None):
+    '''
+    This function runs A* over push moves. Each push costs one, so with an
+    admissible heuristic the first solved state popped from the open list
+    has the fewest pushes possible. Macro moves cost their number of
+    pushes, but they leave out the states in between and so can miss the
+    optimum; they are off by default.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state, it is modified during the search.
+        heuristic: *function*
+            builds the estimate function from the board, see heuristics.py.
+        macro_moves: *boolean*
+            whether tunnel and goal room pushes are taken as one move.
+        stats: *Search_Stats, optional*
+            counts the expanded states, see search_stats.py.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes of the solution, None if there is none.
+    '''
+    estimate = heuristic(board)
+    macros = Macro_Table(board) if macro_moves is True else None
+    if stats is None:
+        stats = Search_Stats()
+    counter = itertools.count()
+
+    if Target_Matching(board, state.boxes).feasible is False:
+        return None
+
+    region = state.reachable_region()
+    start_key = state.state_key(region)
+    parent_dict = {start_key: None}
+    cost_dict = {start_key: 0}
+    # among equal f the deepest state comes first, so a plateau is dived into, not swept breadth first
+    open_heap = [(estimate(state.boxes), 0, next(counter), state.boxes, state.player, state.zobrist, start_key)]
+
+    while len(open_heap) > 0:
+        f, negative_g, _, boxes, player, zobrist, state_key = heapq.heappop(open_heap)
+        g = -negative_g
+        if g > cost_dict[state_key]:
+            continue
+        state.restore(boxes, player, zobrist)
+        if state.is_solved() is True:
+            return trace_push_list(parent_dict, state_key)
+        stats.count_node(g, len(cost_dict))
+
+        # every child moves one box, so the matching is only repaired per child,
+        # and estimating the parent first lets an incremental estimate do the same
+        matching = Target_Matching(board, state.boxes)
+        estimate(state.boxes)
+        region = state.reachable_region()
+        for move in generate_move_list(state, region, macros):
+            state.apply_move(move)
+            cell, destination = move_ends(board, move)
+            if is_deadlock(board, state.boxes, destination) is True:
+                stats.deadlocks += 1
+                state.undo_move(move)
+                continue
+            if matching.update(cell, destination) is True:
+                child_key = state.state_key(state.reachable_region(region, move))
+                child_g = g + len(move)
+                if child_g < cost_dict.get(child_key, child_g + 1):
+                    cost_dict[child_key] = child_g
+                    parent_dict[child_key] = (state_key, move)
+                    heapq.heappush(open_heap, (child_g + estimate(state.boxes), -child_g, next(counter),
+                                               state.boxes, state.player, state.zobrist, child_key))
+                else:
+                    stats.duplicates += 1
+            else:
+                stats.deadlocks += 1
+            matching.retrospect()
+            state.undo_move(move)
+
+    return None
+
+
+def trace_push_list(parent_dict, state_key):
+    '''
+    This function walks the parent links back from a state to the start.
+
+    **Parameters**
+
+        parent_dict: *dict*
+            state key -> (parent key, move), None for the start.
+        state_key: *int*
+            key of the last state.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes from the start to the state.
+    '''
+    move_list = []
+    while parent_dict[state_key] is not None:
+        state_key, move = parent_dict[state_key]
+        move_list.append(move)
+    move_list.reverse()
+    return [push for move in move_list for push in move]
+
+
+def ida_star_search(board, state, heuristic, macro_moves=False, stats=None,
+                    transposition_memory=DEFAULT_TRANSPOSITION_MEMORY):
+    '''
+    This function runs iterative deepening A*. Each iteration is a depth
+    first search cut at f = g + h > bound, and the next bound is the
+    smallest f that was cut. Besides the current path, only a transposition
+    table of fixed size is kept: it skips states already searched in the
+    iteration with fewer pushes, and it remembers the lower bounds learned
+    when a subtree fails, which later iterations start from.
+    As with astar_search, macro moves can cost the optimum.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state, it is modified during the search.
+        heuristic: *function*
+            builds the estimate function from the board, see heuristics.py.
+        macro_moves: *boolean*
+            whether tunnel and goal room pushes are taken as one move.
+        stats: *Search_Stats, optional*
+            counts the expanded states, see search_stats.py.
+        transposition_memory: *int*
+            bytes given to the transposition table, 0 for none.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes of the solution, None if there is none.
+    '''
+    estimate = heuristic(board)
+    macros = Macro_Table(board) if macro_moves is True else None
+    if stats is None:
+        stats = Search_Stats()
+    if state.is_solved() is True:
+        return []
+    table = Transposition_Table(transposition_memory) if transposition_memory > 0 else None
+
+    matching = Target_Matching(board, state.boxes)
+    if matching.feasible is False:
+        return None
+
+    bound = estimate(state.boxes)
+    for iteration in itertools.count(1):
+        push_list, bound = bounded_depth_first_search(board, state, matching, estimate, bound, macros, stats,
+                                                      table, iteration)
+        if push_list is not None:
+            return push_list
+        if bound is None:
+            return None
+
+
+def bounded_depth_first_search(board, state, matching, estimate, bound, macros, stats,
+                               table=None, iteration=1):
+    '''
+    This function is one iteration of ida_star_search.
+
+    Every state on the path keeps the smallest f found below it, cut or
+    not searched; once its moves are all tried that f minus its g is a
+    lower bound on its pushes left, and it goes into the table. Only a
+    subtree cut somewhere by the bound has learned one: a subtree that
+    ended on duplicates and deadlocks alone is dead at any bound, and
+    lowering nothing keeps the search from raising the bound forever.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state, it is back to the same boxes on return.
+        matching: *Target_Matching*
+            box to target matching of the initial state.
+        estimate: *function*
+            box mask -> lower bound.
+        bound: *int*
+            largest f = g + h allowed in this iteration.
+        macros: *Macro_Table*
+            macro analysis of the level, None for single pushes only.
+        stats: *Search_Stats*
+            counts the expanded states.
+        table: *Transposition_Table, optional*
+            transposition table shared by the iterations.
+        iteration: *int*
+            number of the iteration, counted from 1.
+
+    **Returns**
+
+        multiple_result: *tuple*
+            the solution or None, and the next bound or None when
+            nothing was cut.
+    '''
+    region = state.reachable_region()
+    stack_move = []
+    stack_g = [0]
+    stack_key = [state.state_key(region)]
+    stack_lowest_f = [float("inf")]
+    # whether f > bound cut a move somewhere below each state on the path
+    stack_cut = [False]
+    path_key_set = set(stack_key)
+    if table is not None:
+        table.store(stack_key[0], 0, bound, iteration)
+    stats.count_node()
+    stack_possibility = [generate_move_list(state, region, macros)]
+    stack_region = [region]
+    next_bound = None
+
+    while len(stack_possibility) > 0:
+        if stack_possibility[-1] == []:
+            stack_possibility.pop()
+            stack_region.pop()
+            g = stack_g.pop()
+            state_key = stack_key.pop()
+            lowest_f = stack_lowest_f.pop()
+            cut = stack_cut.pop()
+            path_key_set.discard(state_key)
+            if table is not None and cut is True:
+                table.store(state_key, g, lowest_f - g, iteration)
+            if len(stack_move) > 0:
+                if cut is True:
+                    stack_lowest_f[-1] = min(stack_lowest_f[-1], lowest_f)
+                    stack_cut[-1] = True
+                state.undo_move(stack_move.pop())
+                matching.retrospect()
+            continue
+
+        move = stack_possibility[-1].pop()
+        state.apply_move(move)
+
+        if state.is_solved() is True:
+            return [push for path_move in stack_move + [move] for push in path_move], None
+
+        cell, destination = move_ends(board, move)
+        if is_deadlock(board, state.boxes, destination) is True:
+            stats.deadlocks += 1
+            state.undo_move(move)
+            continue
+        if matching.update(cell, destination) is False:
+            stats.deadlocks += 1
+            matching.retrospect()
+            state.undo_move(move)
+            continue
+
+        g = stack_g[-1] + len(move)
+        h = estimate(state.boxes)
+        region = state.reachable_region(stack_region[-1], move)
+        state_key = state.state_key(region)
+        slot = -1 if table is None else table.lookup(state_key)
+        if slot >= 0:
+            stats.table_hits += 1
+            h = max(h, table.bounds[slot])
+        f = g + h
+
+        # a state on the path, or searched with fewer pushes in this iteration, is not searched again
+        if state_key in path_key_set or (slot >= 0 and table.iterations[slot] == iteration
+                                         and table.g_values[slot] <= g):
+            stats.duplicates += 1
+            stack_lowest_f[-1] = min(stack_lowest_f[-1], f)
+            matching.retrospect()
+            state.undo_move(move)
+            continue
+
+        if f > bound:
+            if next_bound is None or f < next_bound:
+                next_bound = f
+            stack_lowest_f[-1] = min(stack_lowest_f[-1], f)
+            stack_cut[-1] = True
+            matching.retrospect()
+            state.undo_move(move)
+            continue
+
+        if table is not None:
+            table.store(state_key, g, h, iteration)
+        stack_move.append(move)
+        stack_g.append(g)
+        stack_lowest_f.append(float("inf"))
+        stack_cut.append(False)
+        stack_key.append(state_key)
+        path_key_set.add(state_key)
+        stats.count_node(len(stack_move))
+        stack_possibility.append(generate_move_list(state, region, macros))
+        stack_region.append(region)
+
+    return None, next_bound
+
+
+FORWARD = 0
+BACKWARD = 1
+
+
+def bidirectional_search(board, state, heuristic=None, macro_moves=False, stats=None):
+    '''
+    This function searches from both ends at once: pushes forward from the
+    initial state and pulls backward from the boxes on the targets, with
+    the player in any region left free around them. Both halves write into
+    one state table keyed by state_key, so a half that reaches a state the
+    other half owns has found a meeting state. The smaller frontier is
+    expanded one whole layer at a time, which keeps the shortest meeting
+    push optimal. Crowded goal areas branch far less when pulled apart than
+    when filled up.
+
+    **Parameters**
+
+        board: *Compact_Board*
+            the level.
+        state: *Compact_State*
+            initial state, it is modified during the search.
+        heuristic: *function, optional*
+            unused, accepted so every engine shares one signature.
+        macro_moves: *boolean*
+            must be False, pulls have no macro moves.
+        stats: *Search_Stats, optional*
+            counts the expanded states, see search_stats.py.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes of the solution, None if there is none.
+    '''
+    if macro_moves is True:
+        raise ValueError("bidirectional search does not take macro moves")
+    if stats is None:
+        stats = Search_Stats()
+    if state.is_solved() is True:
+        return []
+    # the solved boxes are only known when every box has its own target
+    if bin(state.boxes).count("1") != bin(board.targets).count("1"):
+        return astar_search(board, state, heuristic or zero_heuristic, stats=stats)
+    if Target_Matching(board, state.boxes).feasible is False:
+        return None
+
+    # state key -> (side, depth, neighbour key toward its own end, push between them)
+    state_table = {}
+    start_key = state.state_key(state.reachable_region())
+    state_table[start_key] = (FORWARD, 0, None, None)
+    frontier_list = [[(state.boxes, state.player, state.zobrist, start_key)], []]
+
+    goal = Compact_State(board, board.targets, None)
+    free = board.floor & ~board.targets
+    while free:
+        goal.player = (free & -free).bit_length() - 1
+        region = goal.reachable_region()
+        free &= ~region
+        goal_key = goal.state_key(region)
+        state_table[goal_key] = (BACKWARD, 0, None, None)
+        frontier_list[BACKWARD].append((goal.boxes, goal.player, goal.zobrist, goal_key))
+
+    depth_list = [0, 0]
+    while len(frontier_list[FORWARD]) > 0 and len(frontier_list[BACKWARD]) > 0:
+        side = FORWARD if len(frontier_list[FORWARD]) <= len(frontier_list[BACKWARD]) else BACKWARD
+        depth = depth_list[side] + 1
+        next_frontier = []
+        meeting = None
+        for boxes, player, zobrist, state_key in frontier_list[side]:
+            stats.count_node(depth_list[FORWARD] + depth_list[BACKWARD], len(state_table))
+            state.restore(boxes, player, zobrist)
+            region = state.reachable_region()
+            if side == FORWARD:
+                matching = Target_Matching(board, state.boxes)
+                push_list = generate_push_list(state, region)
+            else:
+                push_list = generate_pull_list(state, region)
+
+            for cell, direction in push_list:
+                if side == FORWARD:
+                    state.update(cell, direction)
+                    destination = cell + board.offsets[direction]
+                    if is_deadlock(board, state.boxes, destination) is True:
+                        stats.deadlocks += 1
+                        state.retrospect(cell, direction)
+                        continue
+                    feasible = matching.update(cell, destination)
+                    matching.retrospect()
+                    if feasible is False:
+                        stats.deadlocks += 1
+                        state.retrospect(cell, direction)
+                        continue
+                else:
+                    state.retrospect(cell, direction)
+
+                if side == FORWARD:
+                    child_key = state.state_key(state.reachable_region(region, ((cell, direction),)))
+                else:
+                    child_key = state.state_key(state.reachable_region())
+                entry = state_table.get(child_key)
+                if entry is None:
+                    state_table[child_key] = (side, depth, state_key, (cell, direction))
+                    next_frontier.append((state.boxes, state.player, state.zobrist, child_key))
+                elif entry[0] != side:
+                    if meeting is None or depth + entry[1] < meeting[0]:
+                        meeting = (depth + entry[1], state_key, child_key, (cell, direction))
+                else:
+                    stats.duplicates += 1
+
+                if side == FORWARD:
+                    state.retrospect(cell, direction)
+                else:
+                    state.update(cell, direction)
+
+        # the whole layer is done, so no shorter meeting is left to find
+        if meeting is not None:
+            _, state_key, child_key, push = meeting
+            if side == FORWARD:
+                return join_push_list(state_table, state_key, push, child_key)
+            return join_push_list(state_table, child_key, push, state_key)
+        frontier_list[side] = next_frontier
+        depth_list[side] = depth
+
+    return None
+
+
+def join_push_list(state_table, forward_key, push, backward_key):
+    '''
+    This function stitches the two halves of a bidirectional search
+    together at the push linking a forward state to a backward state.
+
+    **Parameters**
+
+        state_table: *dict*
+            state key -> (side, depth, neighbour key, push).
+        forward_key: *int*
+            key of the forward state of the meeting.
+        push: *tuple*
+            (cell, direction) push from the forward to the backward state.
+        backward_key: *int*
+            key of the backward state of the meeting.
+
+    **Returns**
+
+        push_list: *list*
+            (cell, direction) pushes from the start to the solved state.
+    '''
+    push_list = []
+    while state_table[forward_key][2] is not None:
+        _, _, forward_key, forward_push = state_table[forward_key]
+        push_list.append(forward_push)
+    push_list.reverse()
+    push_list.append(push)
+    while state_table[backward_key][2] is not None:
+        _, _, backward_key, backward_push = state_table[backward_key]
+        push_list.append(backward_push)
+    return push_list
+
+
+SEARCH_STRATEGIES = {
+    "dfs": depth_first_search,
+    "astar": astar_search,
+    "idastar": ida_star_search,
+    "bidirectional": bidirectional_search,
+    "hdastar": hda_star_search,
+    "external": external_search,
+}
@@ -0,0 +1,192 @@
+'''
+Bookkeeping shared by the search engines.
+
+A Search_Stats object is handed to an engine through generate_solution and
+counts what the engine does: the states it expands, the children it drops
+as duplicates or deadlocks, the depth it reaches and the size of its set
+of visited states. generate_solution adds the reachability calls and the
+cache hits of the level, and the time spent in each of its phases.
+
+It also holds the budgets of the search: expanded states, wall-clock
+seconds, states in the visited set, and a cancellation token, any object
+with an is_set method such as threading.Event, that another thread or
+process sets to stop the search. The first budget spent stops the search
+by raising Search_Exhausted, and stop_reason tells which one it was;
+generate_solution turns that into GAME_UNFINISHED. The visited set budget
+is left to the engines whose visited set grows: IDA* keeps a table of
+fixed memory and HDA* spreads its states over processes. When it is given a
+progress function, the function is called with the stats every
+progress_interval seconds while the search runs.
+
+The clock and the token are looked at every CHECK_INTERVAL states, so the
+search never waits on a system call per state.
+'''
+import contextlib
+import time
+
+
+CHECK_INTERVAL = 64
+
+
+class Search_Exhausted(Exception):
+    '''
+    Raised when a search runs out of its budget before it is finished.
+    '''
+
+
+class Search_Stats():
+    '''
+    Counters, timers and progress reports of one search.
+    '''
+
+    def __init__(self, max_nodes=None, time_limit=None, max_visited=None, cancel=None,
+                 progress=None, progress_interval=1.0):
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.max_visited = max_visited
+        self.cancel = cancel
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.start = time.monotonic()
+        self.deadline = None if time_limit is None else self.start + time_limit
+        self.next_progress = self.start + progress_interval
+        # "node_limit", "time_limit", "visited_limit" or "cancelled" once a budget stopped the search
+        self.stop_reason = None
+        # states expanded, and children dropped because they were seen or deadlocked
+        self.nodes = 0
+        self.duplicates = 0
+        self.deadlocks = 0
+        self.max_depth = 0
+        self.visited = 0
+        # reachable_region calls, and the ones answered by the region cache
+        self.region_calls = 0
+        self.region_cache_hits = 0
+        self.table_hits = 0
+        # phase name -> seconds
+        self.phase_times = {}
+
+    def count_node(self, depth=0, visited=0):
+        '''
+        This function records one expanded state.
+
+        **Parameters**
+
+            depth: *int*
+                moves from the start to the state.
+            visited: *int*
+                states in the visited set of the search.
+
+        **Returns**
+
+            None.
+        '''
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if visited > self.visited:
+            self.visited = visited
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.stop("node_limit", "node budget of %d spent" % self.max_nodes)
+        if self.max_visited is not None and visited > self.max_visited:
+            self.stop("visited_limit", "visited set budget of %d spent" % self.max_visited)
+        if self.nodes % CHECK_INTERVAL == 0:
+            self.check_clock()
+
+    def check_clock(self):
+        '''
+        This function stops the search once its deadline is past or its
+        token is set, and reports the progress when it is due.
+
+        **Returns**
+
+            None.
+        '''
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            self.stop("time_limit", "time budget of %s seconds spent" % self.time_limit)
+        if self.cancel is not None and self.cancel.is_set():
+            self.stop("cancelled", "search cancelled")
+        if self.progress is not None and now >= self.next_progress:
+            self.next_progress = now + self.progress_interval
+            self.progress(self)
+
+    def stop(self, reason, message):
+        '''
+        This function stops the search on a spent budget.
+
+        **Parameters**
+
+            reason: *str*
+                which budget was spent, kept in stop_reason.
+            message: *str*
+                message of the exception.
+
+        **Returns**
+
+            None, it always raises Search_Exhausted.
+        '''
+        self.stop_reason = reason
+        raise Search_Exhausted(message)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''
+        This function times the body of a with block as one phase.
+        A phase entered several times adds up.
+
+        **Parameters**
+
+            name: *str*
+                phase name.
+
+        **Returns**
+
+            None.
+        '''
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + time.monotonic() - start
+
+    def summary(self):
+        '''
+        This function gathers every counter, for a JSON record.
+
+        **Returns**
+
+            summary: *dict*
+                counter name -> value, seconds rounded to the millisecond.
+        '''
+        return {
+            "stop_reason": self.stop_reason,
+            "nodes": self.nodes,
+            "duplicates": self.duplicates,
+            "deadlocks": self.deadlocks,
+            "max_depth": self.max_depth,
+            "visited": self.visited,
+            "region_calls": self.region_calls,
+            "region_cache_hits": self.region_cache_hits,
+            "table_hits": self.table_hits,
+            "elapsed": round(time.monotonic() - self.start, 3),
+            "phase_times": {name: round(seconds, 3) for name, seconds in self.phase_times.items()},
+        }
+
+    def report(self):
+        '''
+        This function formats the counters for people to read.
+
+        **Returns**
+
+            report: *str*
+                one counter per line.
+        '''
+        summary = self.summary()
+        line_list = []
+        for name, value in summary.items():
+            if name == "phase_times":
+                for phase_name, seconds in value.items():
+                    line_list.append("%-18s %.3f s" % ("time " + phase_name, seconds))
+            else:
+                line_list.append("%-18s %s" % (name, value))
+        return "\n".join(line_list)
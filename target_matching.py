@@ -0,0 +1,116 @@
+'''
+Box to target feasibility for the push box solver.
+
+Every target must end with its own box on it, so a state where the targets
+can not all be paired with distinct boxes that can each be pushed onto
+them is lost, even when no single box stands on a dead square. Boxes left
+over once every target has one are free to go anywhere. Target_Matching
+keeps such a pairing for the current state and repairs it after every
+push with at most one augmenting path, instead of matching from scratch.
+'''
+from compact_board import iterate_cells
+
+
+class Target_Matching():
+    '''
+    A matching of targets to boxes that covers every target, following the
+    search state through update and retrospect. Every change is written to
+    a journal so retrospect can put the previous matching back.
+    '''
+
+    def __init__(self, board, boxes):
+        self.board = board
+        self.boxes = boxes
+        self.target_of_box = {}
+        self.box_of_target = {}
+        self.journal = []
+
+        changes = []
+        self.feasible = all(self.augment(target, set(), changes) is True
+                            for target in iterate_cells(board.targets))
+
+    def update(self, cell, destination):
+        '''
+        This function follows the push of the box on cell onto destination.
+
+        **Parameters**
+
+            cell: *int*
+                flat index the box left.
+            destination: *int*
+                flat index the box was pushed onto.
+
+        **Returns**
+
+            result: *boolean*
+                whether every target can still get its own box.
+        '''
+        changes = []
+        self.journal.append((self.boxes, changes))
+        self.boxes ^= (1 << cell) | (1 << destination)
+
+        target = self.target_of_box.get(cell)
+        if target is None:
+            # a spare box, no target was counting on it
+            return True
+        self.write(self.target_of_box, cell, None, changes)
+        if (self.board.target_reach[destination] >> target) & 1:
+            self.write(self.target_of_box, destination, target, changes)
+            self.write(self.box_of_target, target, destination, changes)
+            return True
+
+        self.write(self.box_of_target, target, None, changes)
+        return self.augment(target, set(), changes)
+
+    def retrospect(self):
+        '''
+        This function undoes the matching changes of the last update.
+
+        **Returns**
+
+            None.
+        '''
+        self.boxes, changes = self.journal.pop()
+        for mapping, key, value in reversed(changes):
+            if value is None:
+                mapping.pop(key, None)
+            else:
+                mapping[key] = value
+
+    def augment(self, target, visited_box_set, changes):
+        '''
+        This function looks for an augmenting path from an uncovered
+        target, moving other targets to other boxes where needed.
+
+        **Parameters**
+
+            target: *int*
+                flat index of the uncovered target.
+            visited_box_set: *set*
+                boxes already tried on this path.
+            changes: *list*
+                journal entry to write the changes into.
+
+        **Returns**
+
+            result: *boolean*
+                whether the target got a box.
+        '''
+        target_reach = self.board.target_reach
+        for box in iterate_cells(self.boxes):
+            if box in visited_box_set or not (target_reach[box] >> target) & 1:
+                continue
+            visited_box_set.add(box)
+            other = self.target_of_box.get(box)
+            if other is None or self.augment(other, visited_box_set, changes) is True:
+                self.write(self.box_of_target, target, box, changes)
+                self.write(self.target_of_box, box, target, changes)
+                return True
+        return False
+
+    def write(self, mapping, key, value, changes):
+        changes.append((mapping, key, mapping.get(key)))
+        if value is None:
+            mapping.pop(key, None)
+        else:
+            mapping[key] = value
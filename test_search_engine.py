@@ -0,0 +1,51 @@
+'''
+Regression checks of the search engines, run with python -m unittest.
+'''
+import unittest
+
+from box_common import GAME_FAILED
+from box_3 import generate_solution
+from search_engine import SEARCH_STRATEGIES
+from search_stats import Search_Stats
+
+
+# unsolvable, though no dead square, deadlock or target matching check sees it at the start
+UNSOLVABLE_BOARD = [
+    [0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 1, 1, 1, 1, 0],
+    [0, 1, 0, 1, 1, 0, 1, 1, 0],
+    [0, 1, 0, 0, 1, 1, 1, 1, 0],
+    [0, 0, 1, 0, 1, 8, 1, 1, 0],
+    [0, 1, 1, 1, 8, 0, 1, 0, 0],
+    [0, 0, 0, 1, 1, 1, 0, 1, 0],
+    [0, 1, 1, 0, 1, 0, 1, 1, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0],
+]
+UNSOLVABLE_PLAYER = (2, 5)
+UNSOLVABLE_TARGETS = [(6, 2), (6, 1)]
+# far more than any engine needs to prove the level unsolvable
+NODE_BUDGET = 100000
+
+
+class Unsolvable_Level_Test(unittest.TestCase):
+    '''
+    Every engine must give up on an unsolvable level instead of searching
+    until its budget runs out.
+    '''
+
+    def solve(self, **options):
+        board = [row[:] for row in UNSOLVABLE_BOARD]
+        return generate_solution(board, UNSOLVABLE_TARGETS, UNSOLVABLE_PLAYER,
+                                 stats=Search_Stats(max_nodes=NODE_BUDGET), **options)
+
+    def test_every_strategy(self):
+        for strategy in SEARCH_STRATEGIES:
+            with self.subTest(strategy=strategy):
+                self.assertEqual(self.solve(strategy=strategy, processes=2), GAME_FAILED)
+
+    def test_ida_star_without_transposition_table(self):
+        self.assertEqual(self.solve(strategy="idastar", transposition_memory=0), GAME_FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+'''
+Bounded transposition table for ida_star_search.
+
+The table is a fixed number of slots laid out in flat arrays, so its memory
+is paid once when it is made and never grows. Each slot holds the 64 bit
+state key, the g value the state was reached with, the best lower bound
+learned for it and the iteration it was written in (0 for an empty slot).
+
+A key hashes to a bucket of two slots, the usual two-tier layout:
+
+    first slot:  depth preferred, it keeps the state closest to the start,
+                 whose subtree is the largest, unless it is left over from
+                 an earlier iteration.
+    second slot: always replaced, it keeps whatever came last.
+
+A state pushed out of the table is simply searched again, so the search
+still runs to completion whatever the memory cap.
+'''
+from array import array
+
+
+DEFAULT_TRANSPOSITION_MEMORY = 32 * 1024 * 1024
+# bytes per slot: key, g, bound and iteration
+SLOT_SIZE = 8 + 4 + 4 + 4
+
+
+class Transposition_Table():
+    '''
+    A fixed size, open addressed table of (key, g, bound, iteration).
+    '''
+
+    def __init__(self, memory=DEFAULT_TRANSPOSITION_MEMORY):
+        bucket_count = 1
+        while bucket_count * 4 * SLOT_SIZE <= memory:
+            bucket_count *= 2
+        self.mask = bucket_count - 1
+        slot_count = bucket_count * 2
+        self.keys = array('Q', bytes(8 * slot_count))
+        self.g_values = array('i', [0]) * slot_count
+        self.bounds = array('i', [0]) * slot_count
+        self.iterations = array('i', [0]) * slot_count
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        '''
+        This function finds the slot of a key.
+
+        **Parameters**
+
+            key: *int*
+                64 bit state key.
+
+        **Returns**
+
+            slot: *int*
+                index of the slot holding the key, -1 when it is not stored.
+        '''
+        slot = (key & self.mask) * 2
+        for probe in (slot, slot + 1):
+            if self.iterations[probe] != 0 and self.keys[probe] == key:
+                self.hits += 1
+                return probe
+        self.misses += 1
+        return -1
+
+    def store(self, key, g, bound, iteration):
+        '''
+        This function writes an entry, replacing by the two-tier policy.
+
+        **Parameters**
+
+            key: *int*
+                64 bit state key.
+            g: *int*
+                pushes from the start to the state.
+            bound: *int*
+                lower bound on the pushes left from the state.
+            iteration: *int*
+                current iteration, counted from 1.
+
+        **Returns**
+
+            None.
+        '''
+        first = (key & self.mask) * 2
+        if self.keys[first] == key and self.iterations[first] != 0:
+            slot = first
+        elif self.keys[first + 1] == key and self.iterations[first + 1] != 0:
+            slot = first + 1
+        elif self.iterations[first] != iteration or g <= self.g_values[first]:
+            slot = first
+            # the state in the first slot still beats the one in the second
+            if self.iterations[first] != 0 and self.iterations[first] == iteration:
+                self.copy(first, first + 1)
+        else:
+            slot = first + 1
+        self.keys[slot] = key
+        self.g_values[slot] = g
+        self.bounds[slot] = bound
+        self.iterations[slot] = iteration
+
+    def copy(self, source, target):
+        self.keys[target] = self.keys[source]
+        self.g_values[target] = self.g_values[source]
+        self.bounds[target] = self.bounds[source]
+        self.iterations[target] = self.iterations[source]